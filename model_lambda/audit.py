@@ -0,0 +1,163 @@
+"""Audit log of the inputs and outputs of predictions."""
+import gzip
+import json
+import time
+import uuid
+import queue
+import random
+import logging
+import threading
+import collections
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogger(object):
+    """Buffers audit records in a bounded queue and writes them to an object store from a background thread.
+
+    The records are written in batches as gzip compressed JSON Lines objects, a batch is written when it holds
+    batch_size records or when the oldest record in it is flush_interval seconds old. Logging a record never blocks
+    and never raises, records that arrive while the queue is full are dropped and counted.
+
+    """
+
+    def __init__(self, store, prefix="audit", batch_size=100, flush_interval=5.0, queue_size=10000,
+                 sample_rate=1.0):
+        """Create an audit logger that writes to the object store."""
+        self.store = store
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._random = random.Random()  # nosec
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._logged_times = collections.deque()
+        self._counters = collections.Counter()
+        self._thread = None
+
+    def log(self, qualified_name, data, prediction):
+        """Add a record of a prediction to the audit log."""
+        try:
+            if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+                with self._lock:
+                    self._counters["sampled_out"] += 1
+                return
+
+            record = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "qualified_name": qualified_name,
+                "input": data,
+                "output": prediction}
+
+            self._ensure_writer()
+            with self._lock:
+                self._queue.put_nowait(record)
+                self._pending += 1
+                self._logged_times.append(time.monotonic())
+                self._counters["logged"] += 1
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+        except Exception:
+            logger.exception("Could not add a record to the audit log.")
+
+    def flush(self, timeout=None):
+        """Wait until the records logged so far are written, return False if the timeout expired first.
+
+        This should be called when the process shuts down because the records that are still buffered are lost when
+        it exits.
+
+        """
+        with self._lock:
+            if self._pending == 0:
+                return True
+
+        flushed = threading.Event()
+        try:
+            self._ensure_writer()
+            self._queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(timeout=timeout)
+
+    def flush_due(self):
+        """Check if the oldest record that is not written yet was logged more than flush_interval seconds ago.
+
+        The background thread does not run while the execution environment is frozen between invocations, so a
+        batch can be held for longer than flush_interval. Flushing only when this is True bounds how old the records
+        that are not written get without waiting for the writer in every invocation.
+
+        """
+        with self._lock:
+            return len(self._logged_times) > 0 and time.monotonic() - self._logged_times[0] >= self.flush_interval
+
+    def get_metrics(self):
+        """Get the audit log counters."""
+        with self._lock:
+            return {
+                "logged": self._counters["logged"],
+                "sampled_out": self._counters["sampled_out"],
+                "dropped": self._counters["dropped"],
+                "written": self._counters["written"],
+                "write_errors": self._counters["write_errors"],
+                "pending": self._pending}
+
+    def _ensure_writer(self):
+        # starting the writer thread lazily, this also restarts it in a process forked after it was started
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                # a flush was requested, every record logged before it has already been taken off the queue
+                self._write(batch)
+                batch, deadline = [], None
+                item.set()
+                continue
+
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (deadline is not None and time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch):
+        if len(batch) == 0:
+            return
+
+        try:
+            lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+            key = "{}/{}-{}.jsonl.gz".format(self.prefix, datetime.now(timezone.utc).strftime("%Y/%m/%d/%H%M%S%f"),
+                                             uuid.uuid4().hex)
+            self.store.put(key, gzip.compress(lines.encode("utf-8")))
+            with self._lock:
+                self._counters["written"] += len(batch)
+        except Exception:
+            logger.exception("Could not write {} records to the audit log.".format(len(batch)))
+            with self._lock:
+                self._counters["write_errors"] += len(batch)
+        finally:
+            with self._lock:
+                self._pending -= len(batch)
+                for _ in range(len(batch)):
+                    self._logged_times.popleft()
@@ -0,0 +1,38 @@
+"""Helpers for scoring batches of model inputs."""
+import json
+
+
+def deduplicate(rows, key=None):
+    """Find the distinct rows in a batch.
+
+    Returns the distinct rows in the order they first appear and, for every row in the batch, the position of its copy
+    in the list of distinct rows, so that the results of the distinct rows are scattered back with
+    [results[position] for position in positions]. Rows are compared by the key function, which defaults to the JSON
+    encoding of the row with sorted keys.
+
+    """
+    if key is None:
+        key = _canonical_json
+
+    unique_rows = []
+    positions = []
+    index = {}
+    for row in rows:
+        row_key = key(row)
+        position = index.get(row_key)
+        if position is None:
+            position = index[row_key] = len(unique_rows)
+            unique_rows.append(row)
+        positions.append(position)
+    return unique_rows, positions
+
+
+def dedupe_ratio(row_count, unique_row_count):
+    """Get the fraction of the rows in a batch that did not have to be scored because they were duplicates."""
+    if row_count == 0:
+        return 0.0
+    return 1.0 - unique_row_count / row_count
+
+
+def _canonical_json(row):
+    return json.dumps(row, sort_keys=True)
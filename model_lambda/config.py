@@ -1,9 +1,12 @@
 """Configuration settings for the lambda application."""
+import os
 
 
 class Config(object):
     """Configuration for all environments."""
 
+    # a model can be loaded in single precision by adding "precision": "float32" and "parity_sample": <path to a JSON
+    # Lines file of model inputs> to its entry, the conversion is refused if the predictions on the sample change
     models = [
         {
             "module_name": "iris_model.iris_predict",
@@ -11,6 +14,55 @@ class Config(object):
         }
     ]
 
+    # limits enforced on prediction requests before any parsing is done, None disables a limit
+    max_request_body_size = 1048576
+    max_batch_rows = 1000
+    max_concurrent_predictions = 8
+
+    # the number of seconds that a client is told to wait before retrying a request that was shed
+    retry_after = 1
+
+    # audit log of prediction inputs and outputs, the audit log is disabled when the store is None, the store is created
+    # from an entry that names an ObjectStore class and its parameters like the job store below. A LocalObjectStore
+    # writes to the file system of the container, which is lost when Lambda shuts the container down
+    audit_log_store = None
+    audit_log_sample_rate = 1.0
+    audit_log_batch_size = 100
+    audit_log_flush_interval = 5.0
+    audit_log_queue_size = 10000
+
+    # the longest time in seconds that an invocation waits for the audit log to be written when records have been held
+    # for longer than the flush interval, and that the process waits for the audit log to be written on SIGTERM
+    audit_log_flush_timeout = 1.0
+
+    # profiling of single invocations, which are picked by sampling or by a request that sends the token in the
+    # X-Profile header, profiling is disabled when the directory is None
+    profiling_directory = None
+    profiling_token = os.environ.get("PROFILING_TOKEN")
+    profiling_sample_rate = 0.0
+    profiling_mode = "deterministic"
+
+    # scoring jobs that run a model over a dataset saved in the job store, jobs are disabled when the store is None, the
+    # store is created from an entry that names an ObjectStore class and its parameters, like {"module_name":
+    # "model_lambda.storage", "class_name": "LocalObjectStore", "parameters": {"directory": "/tmp/jobs"}}. A
+    # LocalObjectStore is only seen by the invocations that run in one container, so it only works in the server or in a
+    # single container, on Lambda the jobs need a store that is shared by all of the containers
+    job_store = None
+    job_chunk_size = 1000
+
+    # the largest chunk size that a job can be created with, a chunk must be scored within the timeout of the function
+    # that runs the jobs, and the number of times a chunk is attempted before it is marked FAILED
+    max_job_chunk_size = 10000
+    job_max_chunk_attempts = 3
+
+    # the number of seconds that a job run holds the lease of a job after renewing it, it is renewed before each chunk
+    # so it must be longer than scoring one chunk takes
+    job_lease_duration = 120.0
+
+    # a job run stops starting new chunks when less than this fraction of the time that the invocation started with is
+    # left, the timeout of the function that runs the jobs is set in serverless.yml
+    job_time_margin_fraction = 0.1
+
 
 class ProdConfig(Config):
     """Configuration for the prod environment."""
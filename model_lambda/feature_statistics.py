@@ -0,0 +1,217 @@
+"""Streaming summaries of the features in the inputs of a model, used to detect drift."""
+import math
+import threading
+
+
+# the quantiles reported in the summary of a feature
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class QuantileSketch(object):
+    """Mergeable sketch that approximates the quantiles of a stream of numbers in bounded memory.
+
+    Values are appended to a buffer which is compressed into at most about 2 * max_centroids weighted centroids when it
+    fills up, so adding a value takes amortized constant time for a fixed sketch size. As in a t-digest, the weight of a
+    centroid is limited by its quantile so that the tails of the distribution are summarized by small centroids. Two
+    sketches are merged by compressing their centroids together.
+
+    """
+
+    def __init__(self, max_centroids=100):
+        """Create an empty sketch."""
+        self.max_centroids = max_centroids
+        self._means = []
+        self._weights = []
+        self._buffer = []
+        self._buffer_size = max_centroids * 5
+
+    def add(self, value):
+        """Add a value to the sketch."""
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def merge(self, other):
+        """Merge the values summarized by another sketch into this sketch."""
+        other._compress()
+        self._buffer.extend(zip(other._means, other._weights))
+        self._compress()
+
+    def quantile(self, q):
+        """Get the approximate value at the quantile q, None if the sketch is empty."""
+        self._compress()
+        if len(self._means) == 0:
+            return None
+
+        # each centroid is placed at the middle of the range of ranks it covers and values are interpolated in between
+        target = q * sum(self._weights)
+        cumulative_weight = 0.0
+        previous_position, previous_mean = None, None
+        for mean, weight in zip(self._means, self._weights):
+            position = cumulative_weight + weight / 2.0
+            if target <= position:
+                if previous_position is None:
+                    return mean
+                fraction = (target - previous_position) / (position - previous_position)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_position, previous_mean = position, mean
+            cumulative_weight += weight
+        return self._means[-1]
+
+    def to_dict(self):
+        """Get the state of the sketch as a JSON serializable dictionary."""
+        self._compress()
+        return {"max_centroids": self.max_centroids, "means": list(self._means), "weights": list(self._weights)}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Create a sketch from a dictionary created by to_dict()."""
+        sketch = cls(max_centroids=state["max_centroids"])
+        sketch._means = list(state["means"])
+        sketch._weights = list(state["weights"])
+        return sketch
+
+    def _compress(self):
+        if len(self._buffer) == 0:
+            return
+
+        # buffered values have a weight of one, buffered centroids from merged sketches carry their own weight
+        points = list(zip(self._means, self._weights))
+        points.extend(point if isinstance(point, tuple) else (point, 1.0) for point in self._buffer)
+        points.sort()
+        self._buffer = []
+
+        # greedily combining neighbouring points into centroids, the weight of a centroid is capped by a t-digest scale
+        # function proportional to q * (1 - q) * total so that the centroids in the tails stay small, the cap is scaled
+        # with the log of the total weight to keep the number of centroids below 2 * max_centroids
+        total_weight = sum(weight for _, weight in points)
+        scale = max(4.0, 2.0 * math.log(total_weight)) * total_weight / self.max_centroids
+        means, weights = [], []
+        cumulative_weight = 0.0
+        for mean, weight in points:
+            if len(weights) > 0:
+                combined_weight = weights[-1] + weight
+                q = (cumulative_weight + combined_weight / 2.0) / total_weight
+                if combined_weight <= scale * q * (1.0 - q):
+                    means[-1] += (mean - means[-1]) * weight / combined_weight
+                    weights[-1] = combined_weight
+                    continue
+                cumulative_weight += weights[-1]
+            means.append(mean)
+            weights.append(weight)
+        self._means, self._weights = means, weights
+
+
+class FeatureSummary(object):
+    """Running count, mean, variance, minimum, maximum and quantile sketch of the values of one feature."""
+
+    def __init__(self, max_centroids=100):
+        """Create an empty summary."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.sketch = QuantileSketch(max_centroids=max_centroids)
+
+    def add(self, value):
+        """Add a value to the summary."""
+        # updating the mean and the sum of squared differences with Welford's algorithm
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        """Merge the values summarized by another summary into this summary."""
+        if other.count == 0:
+            return
+
+        # combining the means and the sums of squared differences of the two summaries with Chan's algorithm
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """Get the sample variance of the values, None if there are less than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    def to_dict(self):
+        """Get the state of the summary as a JSON serializable dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count > 0 else None,
+            "variance": self.variance,
+            "min": self.minimum,
+            "max": self.maximum,
+            "quantiles": {str(q): self.sketch.quantile(q) for q in QUANTILES},
+            "m2": self.m2,
+            "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Create a summary from a dictionary created by to_dict()."""
+        summary = cls()
+        summary.count = state["count"]
+        summary.mean = state["mean"] if state["mean"] is not None else 0.0
+        summary.m2 = state["m2"]
+        summary.minimum = state["min"]
+        summary.maximum = state["max"]
+        summary.sketch = QuantileSketch.from_dict(state["sketch"])
+        return summary
+
+
+class FeatureStatistics(object):
+    """Summaries of the numerical features in the inputs of one model.
+
+    The raw inputs are not retained. The state returned by to_dict() can be turned back into an object with from_dict()
+    and merged with the statistics collected in other containers.
+
+    """
+
+    def __init__(self, feature_names, max_centroids=100):
+        """Create empty summaries for the features."""
+        self.feature_names = tuple(feature_names)
+        self._summaries = {name: FeatureSummary(max_centroids=max_centroids) for name in self.feature_names}
+        self._lock = threading.Lock()
+
+    def update(self, data):
+        """Add the numerical features in an input of the model to the summaries."""
+        if not isinstance(data, dict):
+            return
+
+        with self._lock:
+            for name, summary in self._summaries.items():
+                value = data.get(name)
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                    summary.add(value)
+
+    def merge(self, other):
+        """Merge the summaries in another FeatureStatistics object into this one."""
+        with self._lock:
+            for name, summary in other._summaries.items():
+                self._summaries.setdefault(name, FeatureSummary()).merge(summary)
+            self.feature_names = tuple(self._summaries.keys())
+
+    def to_dict(self):
+        """Get the state of the summaries as a JSON serializable dictionary keyed by feature name."""
+        with self._lock:
+            return {name: summary.to_dict() for name, summary in self._summaries.items()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Create a FeatureStatistics object from a dictionary created by to_dict()."""
+        statistics = cls(feature_names=state.keys())
+        statistics._summaries = {name: FeatureSummary.from_dict(summary) for name, summary in state.items()}
+        return statistics
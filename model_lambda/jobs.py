@@ -0,0 +1,296 @@
+"""Scoring jobs that run a model over a large dataset in chunks that can be resumed."""
+import io
+import gzip
+import json
+import time
+import uuid
+import logging
+from datetime import datetime, timezone
+
+from model_lambda.batch import deduplicate
+
+
+logger = logging.getLogger(__name__)
+
+# the statuses that a job goes through
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+
+
+class JobManager(object):
+    """Creates scoring jobs and runs them, keeping their state in an object store.
+
+    The input dataset of a job is a JSON Lines object in the store, optionally gzip compressed, with one model input on
+    each line. The first run of a job splits the rows into chunks of chunk_size rows that are saved as separate objects,
+    so that a run only reads the chunks that it scores. The chunks are scored one after the other, the results of each
+    chunk are saved as a gzip compressed JSON Lines object and recorded in the index of the job. Lines that are
+    repeated within a chunk are scored once, the number of distinct lines scored is kept in the index. A job that is
+    stopped, because the lambda ran out of time or was killed, is resumed by running it again, the chunks that already
+    have results are not scored again.
+
+    A chunk that stops the runs that score it, because it can't be scored before the lambda times out or because it
+    kills the process, is attempted max_chunk_attempts times, after that it is marked FAILED and each of its rows gets
+    an error in place of a prediction.
+
+    A run takes a lease on the job that expires lease_duration seconds after it was last renewed, it is renewed before
+    each chunk is scored. A run that finds the job leased by another run leaves it alone, so runs that overlap don't
+    score the same chunks. The store has no conditional writes, the lease is read back after it is written to catch
+    most of the runs that take it at the same time.
+
+    Objects saved for a job:
+        jobs/<job_id>/job.json: the state of the job
+        jobs/<job_id>/index.json: the chunks that have been scored, with their status and row, distinct row and error
+            counts
+        jobs/<job_id>/inputs/<chunk>.jsonl.gz: the input rows of a chunk
+        jobs/<job_id>/results/<chunk>.jsonl.gz: the results of a chunk, one per line in the order of the input rows
+        jobs/unfinished/<job_id>: an empty object that is kept while the job is pending or running
+
+    """
+
+    def __init__(self, store, model_manager, prefix="jobs", default_chunk_size=1000, lease_duration=120.0,
+                 max_chunk_attempts=3):
+        """Create a job manager that keeps jobs in the object store and scores them with the models in the manager."""
+        self.store = store
+        self.model_manager = model_manager
+        self.prefix = prefix
+        self.default_chunk_size = default_chunk_size
+        self.lease_duration = lease_duration
+        self.max_chunk_attempts = max_chunk_attempts
+
+    def submit(self, qualified_name, input_key, chunk_size=None):
+        """Create a job that scores the dataset saved under the input key with a model, return the state of the job.
+
+        The job is not run, raises ValueError if the model or the dataset is not found.
+
+        """
+        if self.model_manager.get_model(qualified_name=qualified_name) is None:
+            raise ValueError("Model not found.")
+        if not self.store.exists(input_key):
+            raise ValueError("Input dataset not found.")
+
+        now = _timestamp()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "qualified_name": qualified_name,
+            "input_key": input_key,
+            "chunk_size": chunk_size if chunk_size is not None else self.default_chunk_size,
+            "status": PENDING,
+            "total_chunks": None,
+            "chunks_completed": 0,
+            "failed_chunks": 0,
+            "chunk_attempts": {},
+            "rows_scored": 0,
+            "unique_rows_scored": 0,
+            "errors": 0,
+            "error": None,
+            "lease": None,
+            "created": now,
+            "updated": now}
+        self._save_job(job)
+        self._save_index(job["job_id"], [])
+        self.store.put(self._unfinished_key(job["job_id"]), b"")
+        return job
+
+    def get_job(self, job_id):
+        """Get the state of a job by id, None if there is no job with the id."""
+        try:
+            return json.loads(self.store.get(self._key(job_id, "job.json")).decode("utf-8"))
+        except (KeyError, ValueError):
+            return None
+
+    def get_results(self, job_id, page):
+        """Get the results of one chunk of a job, None if the chunk has not been scored."""
+        try:
+            data = self.store.get(self._chunk_key(job_id, page))
+        except (KeyError, ValueError):
+            return None
+        return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+
+    def list_unfinished_jobs(self):
+        """Get the ids of the jobs that are pending or running."""
+        # listing the registry of unfinished jobs, the objects of the jobs are not listed
+        return [key.split("/")[-1] for key in self.store.list_keys(prefix=self._unfinished_key(""))]
+
+    def run(self, job_id, time_remaining=None, time_margin=0.0):
+        """Score the chunks of a job that don't have results yet, return the state of the job.
+
+        time_remaining is a function that returns the number of seconds left to run, a new chunk is not started when
+        less than time_margin seconds are left. The job is left in the RUNNING status if it was stopped before all of
+        the chunks were scored, and is returned unchanged if another run holds its lease.
+
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            raise ValueError("Job not found.")
+        if job["status"] in (COMPLETED, FAILED):
+            return job
+
+        owner = uuid.uuid4().hex
+        if not self._take_lease(job, owner):
+            return self.get_job(job_id)
+
+        model_object = self.model_manager.get_model(qualified_name=job["qualified_name"])
+        if model_object is None:
+            return self._fail(job, "Model not found.")
+
+        if job["total_chunks"] is None:
+            try:
+                job["total_chunks"] = self._split_input(job)
+            except Exception:
+                logger.exception("Could not read the input dataset of job {}.".format(job_id))
+                return self._fail(job, "Could not read the input dataset.")
+            job["status"] = RUNNING
+            self._save_job(job)
+
+        # the results saved in the store are the record of which chunks are done, the index only summarizes them
+        index = {entry["chunk"]: entry for entry in self._load_index(job_id)}
+        chunk_size = job["chunk_size"]
+        for chunk in range(job["total_chunks"]):
+            if chunk in index:
+                continue
+
+            if self.store.exists(self._chunk_key(job_id, chunk)):
+                # the results were saved but the lambda stopped before the index was updated, the number of distinct
+                # rows that were scored is not saved with them
+                results = self.get_results(job_id, chunk)
+                unique_rows = len(results)
+                status = COMPLETED
+            else:
+                if time_remaining is not None and time_remaining() < time_margin:
+                    break
+
+                # the attempt is saved with the lease before the chunk is scored, so that the attempts of the runs that
+                # were stopped while scoring it are counted
+                attempts = job["chunk_attempts"].get(str(chunk), 0)
+                if attempts < self.max_chunk_attempts:
+                    job["chunk_attempts"][str(chunk)] = attempts + 1
+                if not self._take_lease(job, owner):
+                    # the lease expired and was taken by another run, which now owns the state of the job
+                    return self.get_job(job_id)
+
+                rows = self._read_rows(job_id, chunk)
+                if attempts < self.max_chunk_attempts:
+                    results, unique_rows = _score(model_object, rows, chunk * chunk_size)
+                    status = COMPLETED
+                else:
+                    error = "The chunk could not be scored in {} attempts.".format(attempts)
+                    results = [{"row": chunk * chunk_size + row_number, "error": error}
+                               for row_number in range(len(rows))]
+                    unique_rows = 0
+                    status = FAILED
+                lines = "".join(json.dumps(result) + "\n" for result in results)
+                self.store.put(self._chunk_key(job_id, chunk), gzip.compress(lines.encode("utf-8")))
+
+            index[chunk] = {
+                "chunk": chunk,
+                "key": self._chunk_key(job_id, chunk),
+                "rows": len(results),
+                "unique_rows": unique_rows,
+                "errors": sum(1 for result in results if "error" in result),
+                "status": status}
+            self._save_index(job_id, [index[key] for key in sorted(index)])
+
+        job["chunks_completed"] = len(index)
+        job["failed_chunks"] = sum(1 for entry in index.values() if entry.get("status") == FAILED)
+        job["rows_scored"] = sum(entry["rows"] for entry in index.values())
+        job["unique_rows_scored"] = sum(entry.get("unique_rows", entry["rows"]) for entry in index.values())
+        job["errors"] = sum(entry["errors"] for entry in index.values())
+        if job["chunks_completed"] == job["total_chunks"]:
+            job["status"] = COMPLETED
+        job["lease"] = None
+        self._save_job(job)
+        return job
+
+    def _take_lease(self, job, owner):
+        # taking the lease of the job or renewing it, a lease held by another run is respected until it expires
+        saved_job = self.get_job(job["job_id"])
+        lease = saved_job.get("lease") if saved_job is not None else None
+        if lease is not None and lease["owner"] != owner and lease["expires"] > time.time():
+            return False
+
+        job["lease"] = {"owner": owner, "expires": time.time() + self.lease_duration}
+        self._save_job(job)
+        saved_job = self.get_job(job["job_id"])
+        return saved_job is not None and saved_job.get("lease") is not None and saved_job["lease"]["owner"] == owner
+
+    def _split_input(self, job):
+        # reading the dataset once and saving its rows as one object per chunk, return the number of chunks
+        stream = io.BytesIO(self.store.get(job["input_key"]))
+        if job["input_key"].endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=stream)
+
+        total_chunks = 0
+        rows = []
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip() == "":
+                continue
+            rows.append(line.rstrip("\r\n"))
+            if len(rows) == job["chunk_size"]:
+                self._save_rows(job["job_id"], total_chunks, rows)
+                total_chunks, rows = total_chunks + 1, []
+        if len(rows) > 0:
+            self._save_rows(job["job_id"], total_chunks, rows)
+            total_chunks += 1
+        return total_chunks
+
+    def _save_rows(self, job_id, chunk, rows):
+        lines = "".join(row + "\n" for row in rows)
+        self.store.put(self._input_key(job_id, chunk), gzip.compress(lines.encode("utf-8")))
+
+    def _read_rows(self, job_id, chunk):
+        return gzip.decompress(self.store.get(self._input_key(job_id, chunk))).decode("utf-8").splitlines()
+
+    def _fail(self, job, error):
+        job["status"] = FAILED
+        job["error"] = error
+        job["lease"] = None
+        self._save_job(job)
+        return job
+
+    def _load_index(self, job_id):
+        try:
+            return json.loads(self.store.get(self._key(job_id, "index.json")).decode("utf-8"))["chunks"]
+        except KeyError:
+            return []
+
+    def _save_index(self, job_id, chunks):
+        self.store.put(self._key(job_id, "index.json"), json.dumps({"chunks": chunks}).encode("utf-8"))
+
+    def _save_job(self, job):
+        job["updated"] = _timestamp()
+        self.store.put(self._key(job["job_id"], "job.json"), json.dumps(job).encode("utf-8"))
+        if job["status"] in (COMPLETED, FAILED):
+            self.store.delete(self._unfinished_key(job["job_id"]))
+
+    def _input_key(self, job_id, chunk):
+        return self._key(job_id, "inputs/{:06d}.jsonl.gz".format(chunk))
+
+    def _chunk_key(self, job_id, chunk):
+        return self._key(job_id, "results/{:06d}.jsonl.gz".format(chunk))
+
+    def _unfinished_key(self, job_id):
+        return "{}/unfinished/{}".format(self.prefix, job_id)
+
+    def _key(self, job_id, name):
+        return "{}/{}/{}".format(self.prefix, job_id, name)
+
+
+def _score(model_object, rows, first_row_number):
+    # scoring the distinct lines of one chunk, a row that can't be scored gets an error in place of a prediction
+    unique_rows, positions = deduplicate(rows, key=str.strip)
+    unique_results = []
+    for row in unique_rows:
+        try:
+            unique_results.append({"prediction": model_object.predict(json.loads(row))})
+        except Exception as e:
+            unique_results.append({"error": str(e)})
+
+    results = [dict(row=first_row_number + row_number, **unique_results[position])
+               for row_number, position in enumerate(positions)]
+    return results, len(unique_rows)
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,54 @@
+"""Registration of an internal Lambda extension, which makes Lambda send SIGTERM to the runtime before a shutdown."""
+import os
+import json
+import logging
+import threading
+import urllib.request
+
+
+logger = logging.getLogger(__name__)
+
+# the version of the Lambda Extensions API
+EXTENSIONS_API_VERSION = "2020-01-01"
+
+
+def register_internal_extension(name, timeout=1.0):
+    """Register an internal extension with the Lambda Extensions API, return False if it was not registered.
+
+    Lambda only sends SIGTERM to the runtime before it shuts down an execution environment when an extension is
+    registered. The extension must be registered while the lambda is initialized, it registers for INVOKE events
+    which are acknowledged by a daemon thread. Nothing is registered outside of Lambda.
+
+    """
+    runtime_api = os.environ.get("AWS_LAMBDA_RUNTIME_API")
+    if runtime_api is None:
+        return False
+
+    base_url = "http://{}/{}/extension".format(runtime_api, EXTENSIONS_API_VERSION)
+    request = urllib.request.Request(base_url + "/register", data=json.dumps({"events": ["INVOKE"]}).encode("utf-8"),
+                                     headers={"Lambda-Extension-Name": name}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:  # nosec
+            extension_id = response.headers["Lambda-Extension-Identifier"]
+    except Exception:
+        logger.exception("Could not register the {} extension.".format(name))
+        return False
+
+    thread = threading.Thread(target=_acknowledge_events, args=(base_url, extension_id), name=name, daemon=True)
+    thread.start()
+    return True
+
+
+def _acknowledge_events(base_url, extension_id):
+    # Lambda completes an invocation when the runtime and every extension have asked for the next event
+    while True:
+        request = urllib.request.Request(base_url + "/event/next",
+                                         headers={"Lambda-Extension-Identifier": extension_id})
+        try:
+            with urllib.request.urlopen(request) as response:  # nosec
+                event = json.loads(response.read().decode("utf-8"))
+        except Exception:
+            logger.exception("Could not get the next event of the extension.")
+            return
+        if event.get("eventType") == "SHUTDOWN":
+            return
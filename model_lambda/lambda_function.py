@@ -1,8 +1,22 @@
 """Lambda function entry point."""
+import os
+import signal
+import asyncio
+import threading
+
 from model_lambda.model_manager import ModelManager
 from model_lambda.config import Config
+from model_lambda.audit import AuditLogger
+from model_lambda.jobs import JobManager
+from model_lambda.storage import LocalObjectStore, create_object_store
+from model_lambda.profiling import RequestProfiler
+from model_lambda.lambda_extension import register_internal_extension
+
+from model_lambda.web_api.admission import AdmissionController
+from model_lambda.web_api import controllers, async_controllers
 
-from model_lambda.web_api.controllers import get_models, get_metadata, predict
+# the source of the events that run scoring jobs
+JOB_EVENT_SOURCE = "model_lambda.jobs"
 
 # instantiating the model manager class
 model_manager = ModelManager()
@@ -10,38 +24,220 @@ model_manager = ModelManager()
 # loading the MLModel objects from configuration
 model_manager.load_models(configuration=Config.models)
 
+# instantiating the admission controller that limits the work done by prediction requests
+admission_controller = AdmissionController(max_body_size=Config.max_request_body_size,
+                                           max_batch_rows=Config.max_batch_rows,
+                                           max_concurrent_predictions=Config.max_concurrent_predictions,
+                                           retry_after=Config.retry_after)
+
+# instantiating the audit logger that records the inputs and outputs of predictions
+if Config.audit_log_store is not None:
+    audit_logger = AuditLogger(store=create_object_store(Config.audit_log_store),
+                               batch_size=Config.audit_log_batch_size,
+                               flush_interval=Config.audit_log_flush_interval,
+                               queue_size=Config.audit_log_queue_size,
+                               sample_rate=Config.audit_log_sample_rate)
+else:
+    audit_logger = None
+
+# instantiating the profiler that profiles invocations on demand
+if Config.profiling_directory is not None:
+    request_profiler = RequestProfiler(store=LocalObjectStore(Config.profiling_directory),
+                                       token=Config.profiling_token,
+                                       sample_rate=Config.profiling_sample_rate,
+                                       mode=Config.profiling_mode)
+else:
+    request_profiler = None
+
+# instantiating the job manager that scores large datasets in chunks
+if Config.job_store is not None:
+    job_manager = JobManager(store=create_object_store(Config.job_store),
+                             model_manager=model_manager,
+                             default_chunk_size=Config.job_chunk_size,
+                             lease_duration=Config.job_lease_duration,
+                             max_chunk_attempts=Config.job_max_chunk_attempts)
+else:
+    job_manager = None
+
 
 def lambda_handler(event, context):
     """Lambda handler function."""
-    # detecting if the event came from an API Gateway
-    if event.get("resource") is not None \
-            and event.get("path") is not None \
-            and event.get("httpMethod") is not None:
+    return _handle_event(event, context, profile=_should_profile(event))
+
+
+async def async_lambda_handler(event, context):
+    """Lambda handler coroutine for hosts that run an event loop, blocking work is done in the default executor.
+
+    Neither the Lambda runtime nor the server in model_lambda/server.py call this coroutine, it exists for external
+    hosts that serve the lambda from an event loop.
+
+    """
+    loop = asyncio.get_running_loop()
+    profile = _should_profile(event)
+
+    # the requests that are not profiled are served by the coroutines of the async_controllers module, the profilers
+    # follow the thread that they are started in so every other event is handled like the synchronous handler does in
+    # the executor
+    if _is_api_gateway_event(event) and not profile:
+        response = await _route(event, controller_module=async_controllers)
+        if _audit_log_flush_due():
+            await loop.run_in_executor(None, _flush_audit_log)
+        return _api_gateway_response(response, None)
 
-        if event["resource"] == "/api/models" and event["httpMethod"] == "GET":
-            # calling the get_models controller function
-            response = get_models()
+    return await loop.run_in_executor(None, _handle_event, event, context, profile)
 
-        elif event["resource"] == "/api/models/{qualified_name}/metadata" and event["httpMethod"] == "GET":
-            # calling the get_metadata controller function
-            response = get_metadata(qualified_name=event["pathParameters"]["qualified_name"])
 
-        elif event["resource"] == "/api/models/{qualified_name}/predict" \
-                and event["httpMethod"] == "POST" \
-                and event.get("pathParameters") is not None \
-                and event["pathParameters"].get("qualified_name") is not None:
-            # calling the predict controller function
-            response = predict(qualified_name=event["pathParameters"]["qualified_name"], request_body=event["body"])
+def shutdown():
+    """Write out the audit records that are still buffered, called before the process exits."""
+    if audit_logger is not None:
+        _flush_audit_log()
 
+
+def _should_profile(event):
+    # running the controller under the profiler when the invocation is selected for profiling
+    return _is_api_gateway_event(event) and request_profiler is not None and request_profiler.should_profile(event)
+
+
+def _handle_event(event, context, profile):
+    # detecting if the event came from an API Gateway
+    if _is_api_gateway_event(event):
+        profile_id = None
+        if profile:
+            response, profile_id = request_profiler.profile(_route, event)
         else:
-            raise ValueError("This lambda cannot handle this resource.")
+            response = _route(event)
+
+        if _audit_log_flush_due():
+            _flush_audit_log()
+
+        return _api_gateway_response(response, profile_id)
 
-        return {
-            "isBase64Encoded": False,
-            "statusCode": response.status,
-            "headers": {"Content-Type": response.mimetype},
-            "body": response.data
-        }
+    # detecting if the event is a request to run scoring jobs, sent by the schedule or by a client
+    elif event.get("source") == JOB_EVENT_SOURCE and job_manager is not None:
+        return _run_jobs(event, context)
 
     else:
         raise ValueError("This lambda cannot handle this event type.")
+
+
+def _audit_log_flush_due():
+    # the writer does not run while the execution environment is frozen, the audit log is written out after a request
+    # only when records have been held for longer than the flush interval
+    return audit_logger is not None and audit_logger.flush_due()
+
+
+def _flush_audit_log():
+    audit_logger.flush(timeout=Config.audit_log_flush_timeout)
+
+
+def _is_api_gateway_event(event):
+    return event.get("resource") is not None \
+        and event.get("path") is not None \
+        and event.get("httpMethod") is not None
+
+
+def _api_gateway_response(response, profile_id):
+    headers = {"Content-Type": response.mimetype}
+    if response.headers is not None:
+        headers.update(response.headers)
+    if profile_id is not None:
+        headers["X-Profile-Id"] = profile_id
+
+    return {
+        "isBase64Encoded": False,
+        "statusCode": response.status,
+        "headers": headers,
+        "body": response.data
+    }
+
+
+def _route(event, controller_module=controllers):
+    # the functions in the async_controllers module return coroutines that are awaited by the caller
+    if event["resource"] == "/api/models" and event["httpMethod"] == "GET":
+        # calling the get_models controller function
+        response = controller_module.get_models(model_manager=model_manager)
+
+    elif event["resource"] == "/api/models/{qualified_name}/metadata" and event["httpMethod"] == "GET":
+        # calling the get_metadata controller function
+        response = controller_module.get_metadata(model_manager=model_manager,
+                                                  qualified_name=event["pathParameters"]["qualified_name"])
+
+    elif event["resource"] == "/api/models/{qualified_name}/predict" \
+            and event["httpMethod"] == "POST" \
+            and event.get("pathParameters") is not None \
+            and event["pathParameters"].get("qualified_name") is not None:
+        # calling the predict controller function
+        response = controller_module.predict(model_manager=model_manager,
+                                             qualified_name=event["pathParameters"]["qualified_name"],
+                                             request_body=event["body"],
+                                             admission_controller=admission_controller,
+                                             audit_logger=audit_logger)
+
+    elif event["resource"] == "/api/admin/models/{qualified_name}/feature_statistics" \
+            and event["httpMethod"] == "GET":
+        # calling the get_feature_statistics controller function
+        response = controller_module.get_feature_statistics(model_manager=model_manager,
+                                                            qualified_name=event["pathParameters"]["qualified_name"])
+
+    elif event["resource"] == "/api/admin/metrics" and event["httpMethod"] == "GET":
+        # calling the get_metrics controller function
+        response = controller_module.get_metrics(admission_controller=admission_controller,
+                                                 audit_logger=audit_logger)
+
+    elif event["resource"] == "/api/jobs" and event["httpMethod"] == "POST":
+        # calling the submit_job controller function
+        response = controller_module.submit_job(job_manager=job_manager, request_body=event["body"])
+
+    elif event["resource"] == "/api/jobs/{job_id}" and event["httpMethod"] == "GET":
+        # calling the get_job controller function
+        response = controller_module.get_job(job_manager=job_manager, job_id=event["pathParameters"]["job_id"])
+
+    elif event["resource"] == "/api/jobs/{job_id}/results" and event["httpMethod"] == "GET":
+        # calling the get_job_results controller function
+        query_parameters = event.get("queryStringParameters") or {}
+        response = controller_module.get_job_results(job_manager=job_manager,
+                                                     job_id=event["pathParameters"]["job_id"],
+                                                     page=query_parameters.get("page", 0))
+
+    else:
+        raise ValueError("This lambda cannot handle this resource.")
+
+    return response
+
+
+def _run_jobs(event, context):
+    # running the job named in the event, or every unfinished job, until the invocation is close to timing out
+    if context is not None:
+        def time_remaining():
+            return context.get_remaining_time_in_millis() / 1000.0
+
+        # the margin is derived from the timeout of the function, which is about the time left when an invocation starts
+        time_margin = time_remaining() * Config.job_time_margin_fraction
+    else:
+        time_remaining, time_margin = None, 0.0
+
+    job_ids = [event["job_id"]] if event.get("job_id") is not None else job_manager.list_unfinished_jobs()
+    jobs = []
+    for job_id in job_ids:
+        if time_remaining is not None and time_remaining() < time_margin:
+            break
+        jobs.append(job_manager.run(job_id, time_remaining=time_remaining, time_margin=time_margin))
+    return {"jobs": jobs}
+
+
+def _handle_sigterm(signal_number, frame):
+    # Lambda sends SIGTERM to the runtime before it shuts down an execution environment that has an extension
+    # registered, the signal is passed on to the handler that was installed before this one
+    shutdown()
+    if callable(_previous_sigterm_handler):
+        _previous_sigterm_handler(signal_number, frame)
+    elif _previous_sigterm_handler == signal.SIG_DFL:
+        signal.signal(signal_number, signal.SIG_DFL)
+        os.kill(os.getpid(), signal_number)
+
+
+# writing out the audit log when the process is asked to stop, signal handlers can only be set in the main thread,
+# Lambda only sends SIGTERM to the runtime when an extension is registered
+if audit_logger is not None and threading.current_thread() is threading.main_thread():
+    _previous_sigterm_handler = signal.signal(signal.SIGTERM, _handle_sigterm)
+    register_internal_extension("model-lambda-audit-log")
@@ -1,18 +1,47 @@
 """Model Manager class for loading, managing, and interacting with models."""
 import importlib
+import threading
+import collections
+from types import MappingProxyType
 
 from ml_model_abc import MLModel
 
+from model_lambda.feature_statistics import FeatureStatistics
+from model_lambda.precision import FLOAT32, FLOAT64, DEFAULT_TOLERANCE, reduce_precision, load_sample
+
+
+# an immutable view of the models held by a ModelManager instance, replaced as a whole when models are reloaded
+ModelSnapshot = collections.namedtuple('ModelSnapshot', ["models", "index", "feature_statistics"])
+
 
 class ModelManager(object):
-    """Singleton class that instantiates and manages model objects."""
+    """Registry that instantiates and manages model objects.
+
+    The models are held in an immutable snapshot which is swapped in a single reference assignment when the models are
+    reloaded, so lookups never take a lock and always see a consistent set of models. Each instance is an independent
+    registry.
+
+    """
+
+    def __init__(self):
+        """Create an empty model registry."""
+        self._snapshot = ModelSnapshot(models=(), index=MappingProxyType({}), feature_statistics=MappingProxyType({}))
 
-    _models = []
+        # serializes writers only, readers never acquire this lock
+        self._write_lock = threading.Lock()
 
-    @classmethod
-    def load_models(cls, configuration):
-        """Load models from configuration."""
-        cls._models = []  # resetting the model list to empty
+    def load_models(self, configuration):
+        """Load models from configuration.
+
+        The new models are fully instantiated before they replace the models currently held by the instance, if any of
+        them fail to load the current models are kept.
+
+        A model is converted to single precision when its configuration sets "precision" to "float32", which is only
+        kept if the predictions it makes on the inputs in the JSON Lines file in "parity_sample" stay within
+        "parity_tolerance" of the ones made in double precision.
+
+        """
+        models = []
         for c in configuration:
             model_module = importlib.import_module(c["module_name"])
             model_class = getattr(model_module, c["class_name"])
@@ -21,31 +50,52 @@ class ModelManager(object):
             if not isinstance(model_object, MLModel):
                 raise ValueError("The ModelManager can only hold references to objects of type MLModel.")
 
-            # saving the model reference to the models list
-            cls._models.append(model_object)
+            precision = c.get("precision", FLOAT64)
+            if precision == FLOAT32:
+                reduce_precision(model_object, sample=load_sample(c.get("parity_sample")),
+                                 tolerance=c.get("parity_tolerance", DEFAULT_TOLERANCE))
+            elif precision != FLOAT64:
+                raise ValueError("The precision of a model must be '{}' or '{}'.".format(FLOAT64, FLOAT32))
+
+            models.append(model_object)
+
+        # the first model with a qualified name wins, the same as a search through the list of models would
+        index = {}
+        for model in models:
+            index.setdefault(model.qualified_name, model)
 
-    @classmethod
-    def get_models(cls):
+        with self._write_lock:
+            # keeping the statistics collected for models that are reloaded with the same input features
+            feature_statistics = {}
+            for qualified_name, model in index.items():
+                feature_names = _feature_names(model)
+                current_statistics = self._snapshot.feature_statistics.get(qualified_name)
+                if current_statistics is not None and current_statistics.feature_names == feature_names:
+                    feature_statistics[qualified_name] = current_statistics
+                else:
+                    feature_statistics[qualified_name] = FeatureStatistics(feature_names=feature_names)
+
+            self._snapshot = ModelSnapshot(models=tuple(models), index=MappingProxyType(index),
+                                           feature_statistics=MappingProxyType(feature_statistics))
+
+    def get_models(self):
         """Get a list of models in the model manager instance."""
         model_objects = [{
             "display_name": model.display_name,
             "qualified_name": model.qualified_name,
             "description": model.description,
             "major_version": model.major_version,
-            "minor_version": model.minor_version} for model in cls._models]
+            "minor_version": model.minor_version} for model in self._snapshot.models]
 
         return model_objects
 
-    @classmethod
-    def get_model_metadata(cls, qualified_name):
+    def get_model_metadata(self, qualified_name):
         """Get a model metadata by qualified name."""
-        # searching the list of model objects to find the one with the right qualified name
-        model_objects = [model for model in cls._models if model.qualified_name == qualified_name]
+        model_object = self._snapshot.index.get(qualified_name)
 
-        if len(model_objects) == 0:
+        if model_object is None:
             return None
         else:
-            model_object = model_objects[0]
             return {
                 "display_name": model_object.display_name,
                 "qualified_name": model_object.qualified_name,
@@ -55,13 +105,45 @@ class ModelManager(object):
                 "input_schema": model_object.input_schema.json_schema("https://example.com/input_schema.json"),
                 "output_schema": model_object.output_schema.json_schema("https://example.com/output_schema.json")}
 
-    @classmethod
-    def get_model(cls, qualified_name):
+    def get_model(self, qualified_name):
         """Get a model object by qualified name."""
-        # searching the list of model objects to find the one with the right qualified name
-        model_objects = [model for model in cls._models if model.qualified_name == qualified_name]
+        return self._snapshot.index.get(qualified_name)
+
+    def update_feature_statistics(self, qualified_name, data):
+        """Add the features in a model input, or in a list of model inputs, to the statistics of the model."""
+        feature_statistics = self._snapshot.feature_statistics.get(qualified_name)
+        if feature_statistics is None:
+            return
+
+        if isinstance(data, list):
+            for row in data:
+                feature_statistics.update(row)
+        else:
+            feature_statistics.update(data)
+
+    def get_feature_statistics(self, qualified_name):
+        """Get the statistics of the input features of a model by qualified name."""
+        feature_statistics = self._snapshot.feature_statistics.get(qualified_name)
 
-        if len(model_objects) == 0:
+        if feature_statistics is None:
             return None
         else:
-            return model_objects[0]
+            return {
+                "qualified_name": qualified_name,
+                "features": feature_statistics.to_dict()}
+
+
+def _feature_names(model_object):
+    # the field names of the model are the keys of its input schema, optional keys wrap the name in a schema object
+    input_schema = getattr(model_object, "input_schema", None)
+    schema_dict = _schema_contents(input_schema)
+    if not isinstance(schema_dict, dict):
+        return ()
+    return tuple(str(_schema_contents(key)) for key in schema_dict)
+
+
+def _schema_contents(schema_object):
+    # the schema package keeps the wrapped value in a private attribute that later versions expose as a property
+    if hasattr(schema_object, "schema"):
+        return schema_object.schema
+    return getattr(schema_object, "_schema", schema_object)
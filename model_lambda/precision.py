@@ -0,0 +1,188 @@
+"""Conversion of the estimators held by models to single precision floating point numbers."""
+import copy
+import json
+import math
+import numbers
+import logging
+
+import numpy
+
+
+logger = logging.getLogger(__name__)
+
+# the precisions that a model can be loaded with
+FLOAT64 = "float64"
+FLOAT32 = "float32"
+
+# the largest difference between a number predicted with and without the conversion that is accepted by default
+DEFAULT_TOLERANCE = 1e-4
+
+# the methods of an estimator that receive a feature matrix
+INPUT_METHODS = frozenset(["predict", "predict_proba", "predict_log_proba", "decision_function", "transform",
+                           "score_samples"])
+
+
+class Float32Estimator(object):
+    """Wraps an estimator whose arrays were converted to float32, casting the feature matrices it receives to float32.
+
+    Every attribute other than the methods that receive a feature matrix is read from the wrapped estimator.
+
+    """
+
+    def __init__(self, estimator):
+        """Wrap the estimator."""
+        self.estimator = estimator
+
+    def __getattr__(self, name):
+        """Get an attribute of the wrapped estimator."""
+        # the wrapped estimator is not set yet when the wrapper is copied or unpickled
+        if name == "estimator":
+            raise AttributeError(name)
+
+        attribute = getattr(self.estimator, name)
+        if name not in INPUT_METHODS or not callable(attribute):
+            return attribute
+
+        def method(X, *args, **kwargs):
+            return attribute(_to_float32(X), *args, **kwargs)
+        return method
+
+
+def reduce_precision(model_object, sample, tolerance=DEFAULT_TOLERANCE):
+    """Convert the estimators held by a model to float32 if its predictions on the sample don't change.
+
+    The estimators are found among the attributes of the model object, their float64 arrays are converted in a copy
+    which is wrapped in a Float32Estimator and put in place of the original. The model's predictions on the sample,
+    a list of model inputs, are then compared with the ones made before the conversion, and the original estimators
+    are put back if any number differs by more than the tolerance, any other value differs, or a prediction fails.
+    The original estimators are also put back if they hold no float64 arrays. Returns the number of bytes saved by the
+    conversion, 0 if the model was not converted.
+
+    """
+    estimators = {name: value for name, value in vars(model_object).items() if _is_estimator(value)}
+    if len(estimators) == 0:
+        logger.warning("Model {} holds no estimators to convert to float32.".format(model_object.qualified_name))
+        return 0
+    if len(sample) == 0:
+        logger.warning("Model {} was not converted to float32, there is no sample to check its predictions "
+                       "with.".format(model_object.qualified_name))
+        return 0
+
+    expected_predictions = [model_object.predict(data) for data in sample]
+
+    bytes_saved = 0
+    for name, estimator in estimators.items():
+        converted_estimator = copy.deepcopy(estimator)
+        bytes_saved += _convert_arrays(converted_estimator)
+        setattr(model_object, name, Float32Estimator(converted_estimator))
+
+    if bytes_saved == 0:
+        for name, estimator in estimators.items():
+            setattr(model_object, name, estimator)
+        logger.warning("Model {} was not converted to float32, its estimators hold no float64 arrays.".format(
+            model_object.qualified_name))
+        return 0
+
+    try:
+        parity = all(_predictions_match(expected, model_object.predict(data), tolerance)
+                     for data, expected in zip(sample, expected_predictions))
+    except Exception:
+        logger.exception("Model {} failed to make predictions after it was converted to float32.".format(
+            model_object.qualified_name))
+        parity = False
+
+    if not parity:
+        for name, estimator in estimators.items():
+            setattr(model_object, name, estimator)
+        logger.warning("Model {} was not converted to float32, its predictions on the sample changed.".format(
+            model_object.qualified_name))
+        return 0
+
+    logger.info("Model {} was converted to float32, saving {} bytes.".format(model_object.qualified_name,
+                                                                             bytes_saved))
+    return bytes_saved
+
+
+def load_sample(path):
+    """Load the model inputs in a JSON Lines file, an empty list if there is no file."""
+    if path is None:
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip() != ""]
+
+
+def _is_estimator(value):
+    # duck typing the scikit-learn estimator interface
+    return hasattr(value, "get_params") and hasattr(value, "predict")
+
+
+def _convert_arrays(estimator, visited=None):
+    # converting the float64 arrays held by an estimator in place, including those of the estimators inside of it
+    visited = set() if visited is None else visited
+    if id(estimator) in visited:
+        return 0
+    visited.add(id(estimator))
+
+    bytes_saved = 0
+    for name, attribute in list(vars(estimator).items()):
+        converted_attribute, attribute_bytes_saved = _convert_value(attribute, visited)
+        if converted_attribute is not attribute:
+            setattr(estimator, name, converted_attribute)
+        bytes_saved += attribute_bytes_saved
+    return bytes_saved
+
+
+def _convert_value(value, visited):
+    # converting a value held by an estimator, the containers are walked because a Pipeline keeps its steps and a
+    # ColumnTransformer its transformers in lists of tuples, return the converted value and the bytes saved
+    if isinstance(value, numpy.ndarray) and value.dtype == numpy.float64:
+        return value.astype(numpy.float32), value.nbytes // 2
+    if hasattr(value, "get_params") and hasattr(value, "__dict__"):
+        # transformers are estimators too, they don't have a predict method
+        return value, _convert_arrays(value, visited)
+
+    if isinstance(value, (list, tuple)):
+        converted_items = [_convert_value(item, visited) for item in value]
+        items = [item for item, _ in converted_items]
+        bytes_saved = sum(item_bytes_saved for _, item_bytes_saved in converted_items)
+        if all(item is original for item, original in zip(items, value)):
+            return value, bytes_saved
+        if isinstance(value, list):
+            return items, bytes_saved
+        # named tuples take their fields as arguments
+        return (type(value)(*items) if hasattr(value, "_fields") else type(value)(items)), bytes_saved
+
+    if isinstance(value, dict):
+        bytes_saved = 0
+        for key, item in list(value.items()):
+            converted_item, item_bytes_saved = _convert_value(item, visited)
+            if converted_item is not item:
+                value[key] = converted_item
+            bytes_saved += item_bytes_saved
+        return value, bytes_saved
+
+    return value, 0
+
+
+def _to_float32(X):
+    # sparse matrices have their own astype, everything else is made into an array
+    if hasattr(X, "astype") and not isinstance(X, numpy.ndarray):
+        return X.astype(numpy.float32)
+    return numpy.asarray(X, dtype=numpy.float32)
+
+
+def _predictions_match(expected, actual, tolerance):
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and expected.keys() == actual.keys() \
+            and all(_predictions_match(expected[key], actual[key], tolerance) for key in expected)
+    if isinstance(expected, (list, tuple)):
+        return isinstance(actual, (list, tuple)) and len(expected) == len(actual) \
+            and all(_predictions_match(e, a, tolerance) for e, a in zip(expected, actual))
+    if _is_number(expected) and _is_number(actual):
+        return math.isclose(expected, actual, rel_tol=tolerance, abs_tol=tolerance)
+    return expected == actual
+
+
+def _is_number(value):
+    # numpy registers its scalar types as numbers, booleans are compared as they are
+    return isinstance(value, numbers.Real) and not isinstance(value, (bool, numpy.bool_))
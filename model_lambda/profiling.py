@@ -0,0 +1,176 @@
+"""Profiling of single invocations of the lambda, triggered on demand."""
+import io
+import sys
+import hmac
+import json
+import time
+import uuid
+import pstats
+import random
+import marshal
+import cProfile
+import logging
+import threading
+import collections
+
+
+logger = logging.getLogger(__name__)
+
+# the profilers that can be used on an invocation
+DETERMINISTIC = "deterministic"
+SAMPLING = "sampling"
+
+
+class RequestProfiler(object):
+    """Runs selected invocations under a profiler and saves the profiles to an object store.
+
+    An invocation is profiled when it is picked by sampling or when the request carries the token in the trigger
+    header, the header is ignored if no token is set. A request that is not profiled only costs a comparison of the
+    sample rate and, when a token is set, a scan of the request headers.
+
+    The deterministic profiler saves a cProfile file that can be loaded with pstats, the sampling profiler saves the
+    sampled call stacks in the folded format used by flame graph tools. A JSON summary of the functions that took the
+    most time is saved along with either one.
+
+    """
+
+    def __init__(self, store, token=None, header_name="X-Profile", sample_rate=0.0, mode=DETERMINISTIC,
+                 prefix="profiles", top_functions=20, sampling_interval=0.001):
+        """Create a profiler that saves the profiles to the object store."""
+        if mode not in (DETERMINISTIC, SAMPLING):
+            raise ValueError("The profiling mode must be '{}' or '{}'.".format(DETERMINISTIC, SAMPLING))
+
+        self.store = store
+        self.token = token
+        self.header_name = header_name.lower()
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.prefix = prefix
+        self.top_functions = top_functions
+        self.sampling_interval = sampling_interval
+        self._random = random.Random()  # nosec
+
+    def should_profile(self, event):
+        """Return True if the invocation that received the event should be profiled."""
+        if self.sample_rate > 0.0 and self._random.random() < self.sample_rate:
+            return True
+
+        if self.token is None:
+            return False
+
+        # the header names of API Gateway events keep the case that the client sent
+        for name, value in (event.get("headers") or {}).items():
+            if name.lower() == self.header_name and isinstance(value, str):
+                return hmac.compare_digest(value.encode("utf-8"), self.token.encode("utf-8"))
+        return False
+
+    def profile(self, function, *args, **kwargs):
+        """Call the function under the profiler, save the profile and return the result along with the profile id.
+
+        Errors raised while saving the profile are logged and don't affect the result of the function.
+
+        """
+        profile_id = uuid.uuid4().hex
+
+        if self.mode == DETERMINISTIC:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(function, *args, **kwargs)
+            try:
+                profiler.create_stats()
+                self.store.put("{}/{}.prof".format(self.prefix, profile_id), marshal.dumps(profiler.stats))
+                summary = _deterministic_summary(profiler, self.top_functions)
+                self._save_summary(profile_id, summary)
+            except Exception:
+                logger.exception("Could not save profile {}.".format(profile_id))
+        else:
+            profiler = _SamplingProfiler(interval=self.sampling_interval)
+            with profiler:
+                result = function(*args, **kwargs)
+            try:
+                folded_stacks = "".join("{} {}\n".format(stack, count) for stack, count in profiler.stacks.items())
+                self.store.put("{}/{}.folded".format(self.prefix, profile_id), folded_stacks.encode("utf-8"))
+                summary = profiler.summary(self.top_functions)
+                self._save_summary(profile_id, summary)
+            except Exception:
+                logger.exception("Could not save profile {}.".format(profile_id))
+
+        return result, profile_id
+
+    def _save_summary(self, profile_id, summary):
+        summary = dict(profile_id=profile_id, mode=self.mode, **summary)
+        self.store.put("{}/{}.json".format(self.prefix, profile_id), json.dumps(summary, indent=2).encode("utf-8"))
+
+
+def _deterministic_summary(profiler, top_functions):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    functions = []
+    for (file_name, line_number, function_name), (_, calls, total_time, cumulative_time, _) in stats.stats.items():
+        functions.append({
+            "function": "{}:{}({})".format(file_name, line_number, function_name),
+            "calls": calls,
+            "total_time": total_time,
+            "cumulative_time": cumulative_time})
+    functions.sort(key=lambda function: function["cumulative_time"], reverse=True)
+    return {"total_time": stats.total_tt, "top_functions": functions[:top_functions]}
+
+
+class _SamplingProfiler(object):
+    """Samples the call stack of the thread that starts it from a background thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._start_time = None
+        self._elapsed_time = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._start_time = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        self._sampler.join()
+        self._elapsed_time = time.perf_counter() - self._start_time
+        return False
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}({})".format(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            # dropping a sample of the thread waiting for the sampler to stop
+            if len(stack) > 0 and not self._stopped.is_set():
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def summary(self, top_functions):
+        # a function's inclusive count is the number of samples it appears in, its self count the samples it is on top
+        inclusive_counts = collections.Counter()
+        self_counts = collections.Counter()
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")
+            for function in set(functions):
+                inclusive_counts[function] += count
+            self_counts[functions[-1]] += count
+
+        # the functions that were running come first, every caller on the stack has the same inclusive count as them
+        functions = [{
+            "function": function,
+            "samples": inclusive_count,
+            "self_samples": self_counts[function]} for function, inclusive_count in inclusive_counts.items()]
+        functions.sort(key=lambda function: (function["self_samples"], function["samples"]), reverse=True)
+        return {
+            "total_time": self._elapsed_time,
+            "samples": self.samples,
+            "sampling_interval": self.interval,
+            "top_functions": functions[:top_functions]}
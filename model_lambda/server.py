@@ -0,0 +1,485 @@
+"""Pre-fork HTTP server that serves the lambda's API from several processes that share the models.
+
+The parent process imports the lambda, which loads the models, and then forks worker processes that accept
+connections on a socket that the parent listens on. Each worker converts the HTTP requests it receives into API
+Gateway events and passes them to the lambda handler, one request at a time, so the number of workers is the number of
+requests served in parallel. The memory pages that hold the models are shared by the workers as long as nobody writes
+to them, the parent freezes the objects it holds so that the garbage collector does not write to them and can move the
+arrays of the models into shared read only memory.
+
+The parent restarts workers that exit or that stop sending heartbeats, reloads the models and replaces the workers one
+at a time when it receives SIGHUP, and stops the workers gracefully when it receives SIGTERM or SIGINT. When scoring
+jobs are enabled, a background worker process that does not serve requests runs the unfinished jobs every
+--job-interval seconds.
+
+Usage:
+    python -m model_lambda.server --host 0.0.0.0 --port 8000 --workers 4 [--share-arrays]
+"""
+import os
+import gc
+import sys
+import mmap
+import json
+import time
+import signal
+import struct
+import socket
+import logging
+import argparse
+import urllib.parse
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import numpy
+
+
+logger = logging.getLogger(__name__)
+
+# the resources of the API, the names in braces match one segment of the path of a request
+RESOURCES = [
+    "/api/models",
+    "/api/models/{qualified_name}/metadata",
+    "/api/models/{qualified_name}/predict",
+    "/api/admin/models/{qualified_name}/feature_statistics",
+    "/api/admin/metrics",
+    "/api/jobs",
+    "/api/jobs/{job_id}",
+    "/api/jobs/{job_id}/results"
+]
+
+# the size of a heartbeat, a timestamp from the monotonic clock
+HEARTBEAT_SIZE = struct.calcsize("d")
+
+
+def event_from_request(method, path, query_string, headers, body):
+    """Convert an HTTP request into an API Gateway proxy event, None if the path does not match a resource."""
+    path_segments = path.rstrip("/").split("/") if path != "/" else [""]
+    for resource in RESOURCES:
+        resource_segments = resource.split("/")
+        if len(resource_segments) != len(path_segments):
+            continue
+
+        path_parameters = {}
+        for resource_segment, path_segment in zip(resource_segments, path_segments):
+            if resource_segment.startswith("{") and resource_segment.endswith("}"):
+                if path_segment == "":
+                    break
+                path_parameters[resource_segment[1:-1]] = urllib.parse.unquote(path_segment)
+            elif resource_segment != path_segment:
+                break
+        else:
+            # API Gateway keeps the last value of a repeated query string parameter, and all of them in another field
+            query_parameters = urllib.parse.parse_qs(query_string, keep_blank_values=True)
+            return {
+                "resource": resource,
+                "path": path,
+                "httpMethod": method,
+                "headers": dict(headers),
+                "queryStringParameters": {name: values[-1] for name, values in query_parameters.items()} or None,
+                "multiValueQueryStringParameters": query_parameters or None,
+                "pathParameters": path_parameters or None,
+                "body": body,
+                "isBase64Encoded": False}
+    return None
+
+
+def share_model_arrays(model_manager, min_bytes=mmap.PAGESIZE):
+    """Move the arrays held by the models into shared read only memory, return the number of bytes moved.
+
+    The arrays are found among the attributes of the model objects and of the estimators they hold, arrays that are
+    smaller than min_bytes are left where they are.
+
+    """
+    bytes_shared = 0
+    visited = set()
+    for model in model_manager.get_models():
+        model_object = model_manager.get_model(qualified_name=model["qualified_name"])
+        bytes_shared += _share_arrays(model_object, min_bytes, visited)
+    return bytes_shared
+
+
+def _share_arrays(value, min_bytes, visited):
+    if id(value) in visited or not hasattr(value, "__dict__"):
+        return 0
+    visited.add(id(value))
+
+    bytes_shared = 0
+    for name, attribute in vars(value).items():
+        if isinstance(attribute, numpy.ndarray):
+            shared_array = _shared_array(attribute, min_bytes)
+            if shared_array is not attribute:
+                setattr(value, name, shared_array)
+                bytes_shared += attribute.nbytes
+        elif isinstance(attribute, list):
+            for i, item in enumerate(attribute):
+                if isinstance(item, numpy.ndarray):
+                    shared_array = _shared_array(item, min_bytes)
+                    if shared_array is not item:
+                        attribute[i] = shared_array
+                        bytes_shared += item.nbytes
+                elif hasattr(item, "get_params"):
+                    bytes_shared += _share_arrays(item, min_bytes, visited)
+        elif hasattr(attribute, "get_params"):
+            # scikit-learn estimators, and wrappers of them, hold the arrays of a model
+            bytes_shared += _share_arrays(attribute, min_bytes, visited)
+    return bytes_shared
+
+
+def _shared_array(array, min_bytes):
+    # arrays of python objects hold references that are written to by the reference counts of the objects
+    if array.nbytes < min_bytes or array.dtype.hasobject:
+        return array
+    buffer = mmap.mmap(-1, array.nbytes)
+    shared_array = numpy.frombuffer(buffer, dtype=array.dtype).reshape(array.shape)
+    shared_array[...] = array
+    shared_array.flags.writeable = False
+    return shared_array
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Serves HTTP requests by passing them to the lambda handler as API Gateway events."""
+
+    def do_GET(self):
+        """Serve a GET request."""
+        self._handle()
+
+    def do_POST(self):
+        """Serve a POST request."""
+        self._handle()
+
+    def _handle(self):
+        url = urllib.parse.urlsplit(self.path)
+        content_length = int(self.headers.get("Content-Length") or 0)
+        if self.server.max_body_size is not None and content_length > self.server.max_body_size:
+            self._send_error(413, "REQUEST_TOO_LARGE", "The body of the request is too large.")
+            return
+        body = self.rfile.read(content_length).decode("utf-8") if content_length > 0 else None
+
+        event = event_from_request(self.command, url.path, url.query, self.headers, body)
+        if event is None:
+            self._send_error(404, "ERROR", "Resource not found.")
+            return
+
+        try:
+            result = self.server.lambda_handler(event=event, context=None)
+        except ValueError:
+            # the lambda raises ValueError for methods and resources it does not serve
+            self._send_error(404, "ERROR", "Resource not found.")
+            return
+        except Exception:
+            logger.exception("Could not serve a request.")
+            self._send_error(500, "ERROR", "Server error.")
+            return
+
+        self._send(result["statusCode"], result["headers"], result["body"] or "")
+
+    def _send_error(self, status, error_type, message):
+        self._send(status, {"Content-Type": "application/json"}, json.dumps({"type": error_type, "message": message}))
+
+    def _send(self, status, headers, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """Log requests with the logging module instead of writing them to stderr."""
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+class PreForkServer(object):
+    """Forks worker processes that serve HTTP requests on a socket opened by the parent process, and supervises them.
+
+    A worker writes a heartbeat to memory shared with the parent after every request and at least once every
+    heartbeat_interval seconds while it waits for requests. A worker that has not written a heartbeat for
+    heartbeat_timeout seconds is killed and replaced, as is a worker that exits.
+
+    """
+
+    def __init__(self, lambda_handler, host="0.0.0.0", port=8000, workers=None, heartbeat_interval=1.0,  # nosec
+                 heartbeat_timeout=30.0, shutdown_timeout=30.0, max_body_size=None, reload=None, shutdown=None,
+                 background=None, background_interval=60.0):
+        """Create a server that passes requests to the lambda handler, the workers default to the number of CPUs.
+
+        reload is called in the parent process before the workers are replaced on SIGHUP, shutdown is called in a
+        worker after it has served its last request. background is called every background_interval seconds in a
+        separate worker process, which is restarted when it exits but does not send heartbeats because a call can take
+        longer than the heartbeat timeout.
+
+        """
+        self.lambda_handler = lambda_handler
+        self.host = host
+        self.port = port
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.max_body_size = max_body_size
+        self.reload = reload
+        self.shutdown = shutdown
+        self.background = background
+        self.background_interval = background_interval
+
+        self.socket = None
+        self._heartbeats = None
+        self._worker_pids = {}
+        self._background_pid = None
+        self._stopping = False
+        self._rolling = False
+
+    def bind(self):
+        """Open the listening socket, return the port it is bound to."""
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(128)
+
+        # the workers wait on the same socket, the ones that lose the race for a connection must not block in accept
+        self.socket.setblocking(False)
+        self.port = self.socket.getsockname()[1]
+        return self.port
+
+    def serve_forever(self):
+        """Start the workers and supervise them until SIGTERM or SIGINT is received."""
+        if self.socket is None:
+            self.bind()
+
+        # the garbage collector writes to the objects it tracks, the objects that exist now are shared with the workers
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        self._heartbeats = mmap.mmap(-1, HEARTBEAT_SIZE * self.workers)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_roll)
+
+        for slot in range(self.workers):
+            self._start_worker(slot)
+        if self.background is not None:
+            self._start_background_worker()
+        logger.info("Serving on {}:{} with {} workers.".format(self.host, self.port, self.workers))
+
+        while not self._stopping:
+            time.sleep(self.heartbeat_interval)
+            self._reap_workers()
+            self._check_heartbeats()
+            if self._rolling:
+                self._rolling = False
+                self._roll_workers()
+
+        self._stop_workers()
+        self.socket.close()
+
+    def _handle_stop(self, signal_number, frame):
+        self._stopping = True
+
+    def _handle_roll(self, signal_number, frame):
+        self._rolling = True
+
+    def _start_worker(self, slot):
+        struct.pack_into("d", self._heartbeats, slot * HEARTBEAT_SIZE, time.monotonic())
+        self._worker_pids[slot] = _fork(self._run_worker, slot)
+
+    def _start_background_worker(self):
+        self._background_pid = _fork(self._run_background_worker)
+
+    def _run_worker(self, slot):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: stopping.append(signal_number))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        server = HTTPServer((self.host, self.port), RequestHandler, bind_and_activate=False)
+        server.socket.close()
+        server.socket = self.socket
+        server.timeout = self.heartbeat_interval
+        server.lambda_handler = self.lambda_handler
+        server.max_body_size = self.max_body_size
+
+        # a request that is being served when SIGTERM arrives is finished before the worker exits
+        while len(stopping) == 0:
+            struct.pack_into("d", self._heartbeats, slot * HEARTBEAT_SIZE, time.monotonic())
+            server.handle_request()
+
+        if self.shutdown is not None:
+            self.shutdown()
+
+    def _run_background_worker(self):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: stopping.append(signal_number))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        self.socket.close()
+
+        # a call that is running when SIGTERM arrives is finished before the worker exits
+        while len(stopping) == 0:
+            try:
+                self.background()
+            except Exception:
+                logger.exception("The background task failed.")
+            deadline = time.monotonic() + self.background_interval
+            while len(stopping) == 0 and time.monotonic() < deadline:
+                time.sleep(min(self.heartbeat_interval, max(deadline - time.monotonic(), 0.0)))
+
+        if self.shutdown is not None:
+            self.shutdown()
+
+    def _reap_workers(self):
+        for slot, pid in list(self._worker_pids.items()):
+            try:
+                reaped_pid, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                reaped_pid, status = pid, 0
+            if reaped_pid == pid:
+                del self._worker_pids[slot]
+                if not self._stopping:
+                    logger.warning("Worker {} exited with status {}, restarting it.".format(pid, status))
+                    self._start_worker(slot)
+
+        if self._background_pid is not None:
+            try:
+                reaped_pid, status = os.waitpid(self._background_pid, os.WNOHANG)
+            except ChildProcessError:
+                reaped_pid, status = self._background_pid, 0
+            if reaped_pid == self._background_pid:
+                self._background_pid = None
+                if not self._stopping:
+                    logger.warning("Background worker {} exited with status {}, restarting it.".format(
+                        reaped_pid, status))
+                    self._start_background_worker()
+
+    def _check_heartbeats(self):
+        now = time.monotonic()
+        for slot, pid in list(self._worker_pids.items()):
+            heartbeat = struct.unpack_from("d", self._heartbeats, slot * HEARTBEAT_SIZE)[0]
+            if now - heartbeat > self.heartbeat_timeout:
+                logger.warning("Worker {} has not sent a heartbeat for {:.1f} seconds, killing it.".format(
+                    pid, now - heartbeat))
+                _kill(pid, signal.SIGKILL)
+
+    def _roll_workers(self):
+        if self.reload is not None:
+            try:
+                self.reload()
+                gc.collect()
+                if hasattr(gc, "freeze"):
+                    gc.freeze()
+            except Exception:
+                logger.exception("Could not reload, the workers are replaced with the current models.")
+
+        # replacing the workers one at a time so that the others keep serving
+        for slot in list(self._worker_pids):
+            pid = self._worker_pids.pop(slot)
+            _kill(pid, signal.SIGTERM)
+            _wait(pid, self.shutdown_timeout)
+            if self._stopping:
+                return
+            self._start_worker(slot)
+
+        if self._background_pid is not None:
+            _kill(self._background_pid, signal.SIGTERM)
+            _wait(self._background_pid, self.shutdown_timeout)
+            self._background_pid = None
+            if self._stopping:
+                return
+            self._start_background_worker()
+        logger.info("Replaced the workers.")
+
+    def _stop_workers(self):
+        pids = list(self._worker_pids.values())
+        if self._background_pid is not None:
+            pids.append(self._background_pid)
+        for pid in pids:
+            _kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        for pid in pids:
+            _wait(pid, max(deadline - time.monotonic(), 0.0))
+        self._worker_pids = {}
+        self._background_pid = None
+
+
+def _fork(target, *args):
+    # running the target in a child process that exits when it returns, return the id of the child process
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            target(*args)
+            exit_code = 0
+        except BaseException:
+            logger.exception("Worker {} failed.".format(os.getpid()))
+        finally:
+            # not running the exit handlers of the parent in the worker
+            os._exit(exit_code)
+    return pid
+
+
+def _kill(pid, signal_number):
+    try:
+        os.kill(pid, signal_number)
+    except ProcessLookupError:
+        pass
+
+
+def _wait(pid, timeout):
+    # waiting for a worker to exit, killing it if it does not exit before the timeout
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reaped_pid, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if reaped_pid == pid:
+            return
+        if time.monotonic() >= deadline:
+            _kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the API of the lambda from several worker processes.")
+    parser.add_argument("--host", default="0.0.0.0", help="The address to listen on.")  # nosec
+    parser.add_argument("--port", type=int, default=8000, help="The port to listen on, 0 picks a free port.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="The number of worker processes, defaults to the number of CPUs.")
+    parser.add_argument("--share-arrays", action="store_true",
+                        help="Move the arrays of the models into shared read only memory before forking.")
+    parser.add_argument("--heartbeat-timeout", type=float, default=30.0,
+                        help="The number of seconds after which a worker that sent no heartbeat is replaced.")
+    parser.add_argument("--job-interval", type=float, default=60.0,
+                        help="The number of seconds between runs of the unfinished scoring jobs.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    # importing the lambda loads the models in the parent process, before the workers are forked
+    from model_lambda import lambda_function
+    from model_lambda.config import Config
+
+    def reload_models():
+        """Load the models again, the workers started afterwards serve the new models."""
+        lambda_function.model_manager.load_models(configuration=Config.models)
+        if args.share_arrays:
+            share_model_arrays(lambda_function.model_manager)
+
+    def run_jobs():
+        """Run the unfinished scoring jobs, the same as the scheduled event of the jobs function."""
+        lambda_function.lambda_handler(event={"source": lambda_function.JOB_EVENT_SOURCE}, context=None)
+
+    if args.share_arrays:
+        logger.info("Moved {} bytes of model arrays into shared memory.".format(
+            share_model_arrays(lambda_function.model_manager)))
+
+    server = PreForkServer(lambda_function.lambda_handler, host=args.host, port=args.port, workers=args.workers,
+                           heartbeat_timeout=args.heartbeat_timeout, max_body_size=Config.max_request_body_size,
+                           reload=reload_models, shutdown=lambda_function.shutdown,
+                           background=run_jobs if lambda_function.job_manager is not None else None,
+                           background_interval=args.job_interval)
+    server.bind()
+    print("Listening on port {}".format(server.port), flush=True)
+    server.serve_forever()
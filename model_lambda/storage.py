@@ -0,0 +1,140 @@
+"""Object stores used to persist files written by the lambda."""
+import os
+import importlib
+import threading
+from abc import ABC, abstractmethod
+
+
+class ObjectStore(ABC):
+    """Base class for a key-value store of binary objects.
+
+    Keys are strings made up of path segments separated by forward slashes, the same as object keys in a bucket.
+
+    """
+
+    @abstractmethod
+    def put(self, key, data):
+        """Save the bytes in data under the key, replacing any existing object."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get(self, key):
+        """Get the bytes saved under the key, raise KeyError if there is no object with the key."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def exists(self, key):
+        """Return True if there is an object saved under the key."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, key):
+        """Delete the object saved under the key, does nothing if there is no object with the key."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def list_keys(self, prefix=""):
+        """Get a sorted list of the keys that start with the prefix."""
+        raise NotImplementedError()
+
+
+class LocalObjectStore(ObjectStore):
+    """Object store that saves objects as files in a local directory."""
+
+    def __init__(self, directory):
+        """Create an object store in the directory, the directory is created if it doesn't exist."""
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, key, data):
+        """Save the bytes in data under the key, replacing any existing object."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # writing to a temporary file first so that readers never see a partially written object
+        temporary_path = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(temporary_path, "wb") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+
+    def get(self, key):
+        """Get the bytes saved under the key, raise KeyError if there is no object with the key."""
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def exists(self, key):
+        """Return True if there is an object saved under the key."""
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key):
+        """Delete the object saved under the key, does nothing if there is no object with the key."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list_keys(self, prefix=""):
+        """Get a sorted list of the keys that start with the prefix."""
+        keys = []
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(root, file_name), self.directory).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.directory, *key.split("/")))
+        if not path.startswith(self.directory + os.sep):
+            raise ValueError("The key '{}' is not valid.".format(key))
+        return path
+
+
+class InMemoryObjectStore(ObjectStore):
+    """Object store that keeps objects in memory, stands in for a bucket in an object storage service."""
+
+    def __init__(self):
+        """Create an empty object store."""
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, data):
+        """Save the bytes in data under the key, replacing any existing object."""
+        with self._lock:
+            self._objects[key] = bytes(data)
+
+    def get(self, key):
+        """Get the bytes saved under the key, raise KeyError if there is no object with the key."""
+        with self._lock:
+            return self._objects[key]
+
+    def exists(self, key):
+        """Return True if there is an object saved under the key."""
+        with self._lock:
+            return key in self._objects
+
+    def delete(self, key):
+        """Delete the object saved under the key, does nothing if there is no object with the key."""
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def list_keys(self, prefix=""):
+        """Get a sorted list of the keys that start with the prefix."""
+        with self._lock:
+            return sorted(key for key in self._objects if key.startswith(prefix))
+
+
+def create_object_store(configuration):
+    """Create an object store from a dictionary that names its class and holds the parameters of the class."""
+    store_module = importlib.import_module(configuration["module_name"])
+    store_class = getattr(store_module, configuration["class_name"])
+    store = store_class(**configuration.get("parameters", {}))
+
+    if not isinstance(store, ObjectStore):
+        raise ValueError("The object store must be of type ObjectStore.")
+    return store
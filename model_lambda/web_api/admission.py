@@ -0,0 +1,91 @@
+"""Admission control for limiting the work that prediction requests can trigger."""
+import threading
+import collections
+
+
+# reasons for which a request can be rejected by the admission controller
+REJECTED_BODY_SIZE = "rejected_body_size"
+REJECTED_BATCH_ROWS = "rejected_batch_rows"
+REJECTED_CONCURRENCY = "rejected_concurrency"
+
+# the number of bytes that one character can take up in a UTF-8 encoded string
+_MAX_UTF8_CHARACTER_SIZE = 4
+
+
+class AdmissionController(object):
+    """Enforces limits on request body size, batch row count and concurrent predictions.
+
+    A limit that is set to None is not enforced. The checks are cheap so that over-limit requests can be rejected
+    before any parsing or model work is done.
+
+    """
+
+    def __init__(self, max_body_size=None, max_batch_rows=None, max_concurrent_predictions=None, retry_after=1):
+        """Create an admission controller with the given limits."""
+        self.max_body_size = max_body_size
+        self.max_batch_rows = max_batch_rows
+        self.max_concurrent_predictions = max_concurrent_predictions
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = collections.Counter()
+
+    def check_body_size(self, request_body):
+        """Return True if the size of the request body in bytes is within the limit."""
+        if self.max_body_size is None or request_body is None:
+            return True
+
+        # the length of a string is a lower bound of its encoded size, so the encoding is only done when necessary
+        if len(request_body) > self.max_body_size:
+            return self._reject(REJECTED_BODY_SIZE)
+
+        if isinstance(request_body, str) and len(request_body) * _MAX_UTF8_CHARACTER_SIZE > self.max_body_size \
+                and len(request_body.encode("utf-8")) > self.max_body_size:
+            return self._reject(REJECTED_BODY_SIZE)
+
+        return True
+
+    def check_batch_rows(self, data):
+        """Return True if the number of rows in a batch of prediction inputs is within the limit."""
+        if self.max_batch_rows is not None and isinstance(data, list) and len(data) > self.max_batch_rows:
+            return self._reject(REJECTED_BATCH_ROWS)
+        return True
+
+    def acquire(self):
+        """Reserve a slot for an in-flight prediction, return False if all slots are taken.
+
+        Never blocks, a request that can't be admitted right away should be shed instead of queued.
+
+        """
+        with self._lock:
+            if self.max_concurrent_predictions is not None and self._in_flight >= self.max_concurrent_predictions:
+                self._counters[REJECTED_CONCURRENCY] += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def admit(self):
+        """Count a request that passed all of the admission checks."""
+        with self._lock:
+            self._counters["admitted"] += 1
+
+    def release(self):
+        """Release a slot reserved by a call to acquire()."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def get_metrics(self):
+        """Get the admission counters."""
+        with self._lock:
+            return {
+                "admitted": self._counters["admitted"],
+                "rejected_body_size": self._counters[REJECTED_BODY_SIZE],
+                "rejected_batch_rows": self._counters[REJECTED_BATCH_ROWS],
+                "rejected_concurrency": self._counters[REJECTED_CONCURRENCY],
+                "in_flight": self._in_flight}
+
+    def _reject(self, reason):
+        with self._lock:
+            self._counters[reason] += 1
+        return False
@@ -0,0 +1,63 @@
+"""Module for the asyncio counterparts of the controller functions.
+
+Each function is a coroutine that takes the same arguments and returns the same Response as the controller function
+of the same name. Controllers that score inputs or read and write the job storage run the controller function in the
+default executor of the event loop so that the loop is free to run other coroutines, the controllers that only read
+from memory are run in the event loop.
+
+The coroutines are served by async_lambda_handler() in the lambda_function module, which exists only for external hosts
+that run the lambda in an event loop. The Lambda runtime and the server in model_lambda/server.py call the synchronous
+controllers.
+
+"""
+import asyncio
+import functools
+
+from model_lambda.web_api import controllers
+
+
+async def get_models(model_manager):
+    """List of models available."""
+    return controllers.get_models(model_manager=model_manager)
+
+
+async def get_metadata(model_manager, qualified_name):
+    """Metadata about one model."""
+    return controllers.get_metadata(model_manager=model_manager, qualified_name=qualified_name)
+
+
+async def predict(model_manager, qualified_name, request_body, admission_controller=None, audit_logger=None):
+    """Endpoint that uses a model to make a prediction, the model is called in the executor."""
+    return await _run_in_executor(controllers.predict, model_manager=model_manager, qualified_name=qualified_name,
+                                  request_body=request_body, admission_controller=admission_controller,
+                                  audit_logger=audit_logger)
+
+
+async def get_feature_statistics(model_manager, qualified_name):
+    """Statistics of the input features of one model."""
+    return controllers.get_feature_statistics(model_manager=model_manager, qualified_name=qualified_name)
+
+
+async def get_metrics(admission_controller, audit_logger=None):
+    """Operational metrics of the lambda."""
+    return controllers.get_metrics(admission_controller=admission_controller, audit_logger=audit_logger)
+
+
+async def submit_job(job_manager, request_body):
+    """Create a job that scores a dataset with a model, the job storage is written in the executor."""
+    return await _run_in_executor(controllers.submit_job, job_manager=job_manager, request_body=request_body)
+
+
+async def get_job(job_manager, job_id):
+    """Status and progress of one scoring job, the job storage is read in the executor."""
+    return await _run_in_executor(controllers.get_job, job_manager=job_manager, job_id=job_id)
+
+
+async def get_job_results(job_manager, job_id, page):
+    """One page of the results of a scoring job, the job storage is read in the executor."""
+    return await _run_in_executor(controllers.get_job_results, job_manager=job_manager, job_id=job_id, page=page)
+
+
+async def _run_in_executor(function, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(function, **kwargs))
@@ -1,22 +1,30 @@
 """Module for the controller functions."""
 import json
 import collections
+from marshmallow import ValidationError
 from ml_model_abc import MLModelSchemaValidationException
 
-from model_lambda.model_manager import ModelManager
-from model_lambda.web_api.schemas import ModelCollectionSchema, ModelMetadataSchema, ErrorSchema
+from model_lambda.batch import deduplicate, dedupe_ratio
+from model_lambda.web_api.schemas import ModelCollectionSchema, ModelMetadataSchema, FeatureStatisticsSchema, \
+    MetricsSchema, JobRequestSchema, JobSchema, JobResultsPageSchema, ErrorSchema
 
 
-# creating a named tuple to hold a response that will be returned to the lambda function
-Response = collections.namedtuple('Response', ["data", "status", "mimetype"])
+# creating a named tuple to hold a response that will be returned to the lambda function, the headers are optional
+Response = collections.namedtuple('Response', ["data", "status", "mimetype", "headers"])
+Response.__new__.__defaults__ = (None,)
 
 # instantiating the marshmallow schema objects here so we can reuse them below
 model_collection_schema = ModelCollectionSchema()
 model_metadata_schema = ModelMetadataSchema()
+feature_statistics_schema = FeatureStatisticsSchema()
+metrics_schema = MetricsSchema()
+job_request_schema = JobRequestSchema()
+job_schema = JobSchema()
+job_results_page_schema = JobResultsPageSchema()
 error_schema = ErrorSchema()
 
 
-def get_models():
+def get_models(model_manager):
     """List of models available.
 
     ---
@@ -29,16 +37,13 @@ def get_models():
               schema:
                 $ref: '#/components/schemas/ModelCollection'
     """
-    # instantiating ModelManager singleton
-    model_manager = ModelManager()
-
     # retrieving the model object from the model manager
     models = model_manager.get_models()
     response_data = model_collection_schema.dumps(dict(models=models))
     return Response(data=response_data, status=200, mimetype="application/json")
 
 
-def get_metadata(qualified_name):
+def get_metadata(model_manager, qualified_name):
     """Metadata about one model.
 
     ---
@@ -64,7 +69,6 @@ def get_metadata(qualified_name):
               schema:
                 $ref: '#/components/schemas/Error'
     """
-    model_manager = ModelManager()
     metadata = model_manager.get_model_metadata(qualified_name=qualified_name)
     if metadata is not None:
         response_data = model_metadata_schema.dumps(metadata)
@@ -75,9 +79,14 @@ def get_metadata(qualified_name):
         return Response(data=response_data, status=400, mimetype='application/json')
 
 
-def predict(qualified_name, request_body):
+def predict(model_manager, qualified_name, request_body, admission_controller=None, audit_logger=None):
     """Endpoint that uses a model to make a prediction.
 
+    The body of the request can hold a single input or a JSON array of inputs, in which case the response holds an
+    array of predictions in the same order. Identical inputs in an array are scored once, the fraction of inputs that
+    were duplicates is returned in the X-Dedupe-Ratio header. Successful predictions are added to the audit log if one
+    is provided.
+
     ---
     post:
       parameters:
@@ -91,6 +100,11 @@ def predict(qualified_name, request_body):
         200:
           description: Prediction is succesful. The schema of the body of the response is described by the model's
             output schema.
+          headers:
+            X-Dedupe-Ratio:
+              description: The fraction of the inputs in an array that were duplicates and were not scored again.
+              schema:
+                type: number
         400:
           description: Input is not valid JSON or does not meet the model's input schema.
           content:
@@ -103,6 +117,19 @@ def predict(qualified_name, request_body):
             application/json:
               schema:
                 $ref: '#/components/schemas/Error'
+        413:
+          description: The body of the request is too large or holds too many inputs.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        429:
+          description: Too many predictions are in progress, the Retry-After header holds the number of seconds to
+            wait before retrying.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
         500:
           description: Server error.
           content:
@@ -110,6 +137,28 @@ def predict(qualified_name, request_body):
               schema:
                 $ref: '#/components/schemas/Error'
     """
+    if admission_controller is None:
+        return _predict(model_manager, qualified_name, request_body, admission_controller, audit_logger)
+
+    # rejecting requests that are over the limits before doing any parsing
+    if not admission_controller.check_body_size(request_body):
+        response = dict(type="REQUEST_TOO_LARGE", message="The body of the request is too large.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=413, mimetype='application/json')
+
+    if not admission_controller.acquire():
+        response = dict(type="TOO_MANY_REQUESTS", message="Too many predictions are in progress.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=429, mimetype='application/json',
+                        headers={"Retry-After": str(admission_controller.retry_after)})
+
+    try:
+        return _predict(model_manager, qualified_name, request_body, admission_controller, audit_logger)
+    finally:
+        admission_controller.release()
+
+
+def _predict(model_manager, qualified_name, request_body, admission_controller, audit_logger):
     # attempting to deserialize JSON in body of request
     try:
         data = json.loads(request_body)
@@ -118,8 +167,14 @@ def predict(qualified_name, request_body):
         response_data = error_schema.dumps(response)
         return Response(data=response_data, status=400, mimetype='application/json')
 
+    if admission_controller is not None:
+        if not admission_controller.check_batch_rows(data):
+            response = dict(type="REQUEST_TOO_LARGE", message="The request holds too many inputs.")
+            response_data = error_schema.dumps(response)
+            return Response(data=response_data, status=413, mimetype='application/json')
+        admission_controller.admit()
+
     # getting the model object from the Model Manager
-    model_manager = ModelManager()
     model_object = model_manager.get_model(qualified_name=qualified_name)
 
     # returning a 404 if model is not found
@@ -128,9 +183,17 @@ def predict(qualified_name, request_body):
         response_data = error_schema.dumps(response)
         return Response(data=response_data, status=404, mimetype='application/json')
 
+    headers = None
     try:
-        prediction = model_object.predict(data)
-        return Response(data=json.dumps(prediction), status=200, mimetype="application/json")
+        if isinstance(data, list):
+            # scoring each distinct input once and copying its prediction to the positions of its duplicates
+            unique_rows, positions = deduplicate(data)
+            unique_predictions = [model_object.predict(row) for row in unique_rows]
+            prediction = [unique_predictions[position] for position in positions]
+            headers = {"X-Dedupe-Ratio": "{:.4f}".format(dedupe_ratio(len(data), len(unique_rows)))}
+        else:
+            prediction = model_object.predict(data)
+        response_data = json.dumps(prediction)
     except MLModelSchemaValidationException as e:
         # responding with a 400 if the schema does not meet the model's input schema
         response = dict(type="SCHEMA_ERROR", message=str(e))
@@ -140,3 +203,273 @@ def predict(qualified_name, request_body):
         response = dict(type="ERROR", message="Could not make a prediction.")
         response_data = error_schema.dumps(response)
         return Response(data=response_data, status=500, mimetype='application/json')
+
+    model_manager.update_feature_statistics(qualified_name=qualified_name, data=data)
+
+    if audit_logger is not None:
+        if isinstance(data, list):
+            for row, row_prediction in zip(data, prediction):
+                audit_logger.log(qualified_name=qualified_name, data=row, prediction=row_prediction)
+        else:
+            audit_logger.log(qualified_name=qualified_name, data=data, prediction=prediction)
+
+    return Response(data=response_data, status=200, mimetype="application/json", headers=headers)
+
+
+def get_feature_statistics(model_manager, qualified_name):
+    """Statistics of the input features of one model.
+
+    The summaries cover the inputs of the successful predictions made by this instance of the lambda, they include the
+    state needed to merge them with the summaries collected by other instances.
+
+    ---
+    get:
+      parameters:
+        - in: path
+          name: qualified_name
+          schema:
+            type: string
+          required: true
+          description: The qualified name of the model for which feature statistics are being requested.
+      security:
+        - api_key: []
+      responses:
+        200:
+          description: Statistics of the input features of one model
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/FeatureStatistics'
+        404:
+          description: Model not found.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+    """
+    feature_statistics = model_manager.get_feature_statistics(qualified_name=qualified_name)
+    if feature_statistics is not None:
+        response_data = feature_statistics_schema.dumps(feature_statistics)
+        return Response(data=response_data, status=200, mimetype='application/json')
+    else:
+        response = dict(type="ERROR", message="Model not found.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=404, mimetype='application/json')
+
+
+def get_metrics(admission_controller, audit_logger=None):
+    """Operational metrics of the lambda.
+
+    ---
+    get:
+      security:
+        - api_key: []
+      responses:
+        200:
+          description: Operational metrics of the lambda
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Metrics'
+    """
+    metrics = dict(admission=admission_controller.get_metrics(),
+                   audit=audit_logger.get_metrics() if audit_logger is not None else None)
+    response_data = metrics_schema.dumps(metrics)
+    return Response(data=response_data, status=200, mimetype="application/json")
+
+
+def submit_job(job_manager, request_body):
+    """Create a job that scores a dataset with a model.
+
+    The dataset is a JSON Lines object that must already be saved in the job storage, the job is run in chunks by the
+    scheduled job event of the lambda and its progress is returned by the job endpoint.
+
+    ---
+    post:
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/JobRequest'
+      responses:
+        202:
+          description: The job was created.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Job'
+        400:
+          description: The request has no body, is not valid JSON or does not meet the schema.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        404:
+          description: Model or input dataset not found.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        501:
+          description: Scoring jobs are not enabled.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+    """
+    if job_manager is None:
+        response = dict(type="NOT_IMPLEMENTED", message="Scoring jobs are not enabled.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=501, mimetype='application/json')
+
+    if request_body is None:
+        response = dict(type="DESERIALIZATION_ERROR", message="The request has no body.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=400, mimetype='application/json')
+
+    try:
+        job_request = job_request_schema.loads(request_body)
+    except json.decoder.JSONDecodeError as e:
+        response = dict(type="DESERIALIZATION_ERROR", message=str(e))
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=400, mimetype='application/json')
+    except ValidationError as e:
+        response = dict(type="SCHEMA_ERROR", message=str(e.messages))
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=400, mimetype='application/json')
+
+    try:
+        job = job_manager.submit(**job_request)
+    except ValueError as e:
+        response = dict(type="ERROR", message=str(e))
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=404, mimetype='application/json')
+
+    response_data = job_schema.dumps(job)
+    return Response(data=response_data, status=202, mimetype="application/json")
+
+
+def get_job(job_manager, job_id):
+    """Status and progress of one scoring job.
+
+    ---
+    get:
+      parameters:
+        - in: path
+          name: job_id
+          schema:
+            type: string
+          required: true
+          description: The id of the job.
+      responses:
+        200:
+          description: Status and progress of one scoring job
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Job'
+        404:
+          description: Job not found.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        501:
+          description: Scoring jobs are not enabled.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+    """
+    if job_manager is None:
+        response = dict(type="NOT_IMPLEMENTED", message="Scoring jobs are not enabled.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=501, mimetype='application/json')
+
+    job = job_manager.get_job(job_id=job_id)
+    if job is not None:
+        response_data = job_schema.dumps(job)
+        return Response(data=response_data, status=200, mimetype='application/json')
+    else:
+        response = dict(type="ERROR", message="Job not found.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=404, mimetype='application/json')
+
+
+def get_job_results(job_manager, job_id, page):
+    """One page of the results of a scoring job.
+
+    Each page holds the results of one chunk of the dataset, a page can be read as soon as its chunk is scored.
+
+    ---
+    get:
+      parameters:
+        - in: path
+          name: job_id
+          schema:
+            type: string
+          required: true
+          description: The id of the job.
+        - in: query
+          name: page
+          schema:
+            type: integer
+            default: 0
+          required: false
+          description: The number of the page of results.
+      responses:
+        200:
+          description: One page of the results of a scoring job
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/JobResultsPage'
+        400:
+          description: The page is not a number.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        404:
+          description: Job or results page not found.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+        501:
+          description: Scoring jobs are not enabled.
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/Error'
+    """
+    if job_manager is None:
+        response = dict(type="NOT_IMPLEMENTED", message="Scoring jobs are not enabled.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=501, mimetype='application/json')
+
+    try:
+        page = int(page)
+    except (TypeError, ValueError):
+        response = dict(type="ERROR", message="The page must be a number.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=400, mimetype='application/json')
+
+    job = job_manager.get_job(job_id=job_id)
+    if job is None:
+        response = dict(type="ERROR", message="Job not found.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=404, mimetype='application/json')
+
+    results = job_manager.get_results(job_id=job_id, page=page) if page >= 0 else None
+    if results is None:
+        response = dict(type="ERROR", message="Results page not found.")
+        response_data = error_schema.dumps(response)
+        return Response(data=response_data, status=404, mimetype='application/json')
+
+    total_pages = job["total_chunks"]
+    results_page = dict(job_id=job_id, page=page, total_pages=total_pages, results=results,
+                        next_page=page + 1 if total_pages is not None and page + 1 < total_pages else None)
+    response_data = job_results_page_schema.dumps(results_page)
+    return Response(data=response_data, status=200, mimetype="application/json")
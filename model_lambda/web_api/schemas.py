@@ -1,5 +1,7 @@
 """Schemas for the web api."""
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+
+from model_lambda.config import Config
 
 
 class ModelSchema(Schema):
@@ -49,6 +51,144 @@ class ModelMetadataSchema(ModelSchema):
                                   description="The JSON schema of the output of the model.")
 
 
+class QuantileSketchSchema(Schema):
+    """A schema for the state of a quantile sketch."""
+
+    max_centroids = fields.Integer(required=True, allow_none=False,
+                                   description="The number of centroids the sketch is compressed to.")
+    means = fields.List(fields.Float(), required=True, allow_none=False, description="The means of the centroids.")
+    weights = fields.List(fields.Float(), required=True, allow_none=False,
+                          description="The weights of the centroids.")
+
+
+class FeatureSummarySchema(Schema):
+    """A schema for the summary of the values of one input feature of a model."""
+
+    count = fields.Integer(required=True, allow_none=False, description="The number of values summarized.")
+    mean = fields.Float(required=True, allow_none=True, description="The mean of the values.")
+    variance = fields.Float(required=True, allow_none=True, description="The sample variance of the values.")
+    min = fields.Float(required=True, allow_none=True, description="The smallest value.")
+    max = fields.Float(required=True, allow_none=True, description="The largest value.")
+    quantiles = fields.Dict(keys=fields.String(), values=fields.Float(allow_none=True), required=True,
+                            allow_none=False, description="The approximate values at a set of quantiles.")
+    m2 = fields.Float(required=True, allow_none=False,
+                      description="The sum of squared differences from the mean, used to merge summaries.")
+    sketch = fields.Nested(QuantileSketchSchema, required=True, allow_none=False,
+                           description="The quantile sketch of the values, used to merge summaries.")
+
+
+class FeatureStatisticsSchema(Schema):
+    """A schema for the statistics of the input features of a model."""
+
+    qualified_name = fields.String(required=True, allow_none=False, description="The qualified name of the model.")
+    features = fields.Dict(keys=fields.String(), values=fields.Nested(FeatureSummarySchema()), required=True,
+                           allow_none=False, description="The summaries of the input features, keyed by name.")
+
+
+class AdmissionMetricsSchema(Schema):
+    """A schema for the counters of the admission controller."""
+
+    admitted = fields.Integer(required=True, allow_none=False, description="The number of predictions admitted.")
+    rejected_body_size = fields.Integer(required=True, allow_none=False,
+                                        description="The number of requests rejected because the body was too large.")
+    rejected_batch_rows = fields.Integer(required=True, allow_none=False,
+                                         description="The number of requests rejected because they held too many "
+                                                     "inputs.")
+    rejected_concurrency = fields.Integer(required=True, allow_none=False,
+                                          description="The number of requests rejected because too many predictions "
+                                                      "were in progress.")
+    in_flight = fields.Integer(required=True, allow_none=False,
+                               description="The number of predictions currently in progress.")
+
+
+class AuditMetricsSchema(Schema):
+    """A schema for the counters of the audit log."""
+
+    logged = fields.Integer(required=True, allow_none=False,
+                            description="The number of records added to the audit log.")
+    sampled_out = fields.Integer(required=True, allow_none=False,
+                                 description="The number of records left out of the audit log by sampling.")
+    dropped = fields.Integer(required=True, allow_none=False,
+                             description="The number of records dropped because the audit log queue was full.")
+    written = fields.Integer(required=True, allow_none=False,
+                             description="The number of records written to the audit log.")
+    write_errors = fields.Integer(required=True, allow_none=False,
+                                  description="The number of records that could not be written to the audit log.")
+    pending = fields.Integer(required=True, allow_none=False,
+                             description="The number of records waiting to be written to the audit log.")
+
+
+class MetricsSchema(Schema):
+    """A schema for the operational metrics of the lambda."""
+
+    admission = fields.Nested(AdmissionMetricsSchema, required=True, allow_none=False,
+                              description="The counters of the admission controller.")
+    audit = fields.Nested(AuditMetricsSchema, required=False, allow_none=True,
+                          description="The counters of the audit log, null if the audit log is disabled.")
+
+
+class JobRequestSchema(Schema):
+    """A schema for a request to create a scoring job."""
+
+    qualified_name = fields.String(required=True, allow_none=False,
+                                   description="The qualified name of the model used to score the dataset.")
+    input_key = fields.String(required=True, allow_none=False,
+                              description="The key of the JSON Lines dataset to score in the object store.")
+    chunk_size = fields.Integer(required=False, allow_none=False,
+                                validate=validate.Range(min=1, max=Config.max_job_chunk_size),
+                                description="The number of rows scored in each chunk of the job.")
+
+
+class JobSchema(Schema):
+    """A schema for the state of a scoring job."""
+
+    job_id = fields.String(required=True, allow_none=False, description="The id of the job.")
+    qualified_name = fields.String(required=True, allow_none=False,
+                                   description="The qualified name of the model used to score the dataset.")
+    input_key = fields.String(required=True, allow_none=False,
+                              description="The key of the JSON Lines dataset to score in the object store.")
+    chunk_size = fields.Integer(required=True, allow_none=False,
+                                description="The number of rows scored in each chunk of the job.")
+    status = fields.String(required=True, allow_none=False,
+                           description="The status of the job, one of PENDING, RUNNING, COMPLETED or FAILED.")
+    total_chunks = fields.Integer(required=True, allow_none=True,
+                                  description="The number of chunks in the job, null until the job first runs.")
+    chunks_completed = fields.Integer(required=True, allow_none=False,
+                                      description="The number of chunks that have been scored.")
+    failed_chunks = fields.Integer(required=True, allow_none=False,
+                                   description="The number of chunks that could not be scored, their rows have errors.")
+    rows_scored = fields.Integer(required=True, allow_none=False, description="The number of rows scored.")
+    unique_rows_scored = fields.Integer(required=True, allow_none=False,
+                                        description="The number of distinct rows that were scored by the model, rows "
+                                                    "repeated within a chunk are scored once.")
+    errors = fields.Integer(required=True, allow_none=False,
+                            description="The number of rows that could not be scored.")
+    error = fields.String(required=True, allow_none=True, description="The reason the job failed.")
+    created = fields.String(required=True, allow_none=False, description="The time the job was created.")
+    updated = fields.String(required=True, allow_none=False, description="The time the job was last updated.")
+
+
+class JobResultSchema(Schema):
+    """A schema for the result of scoring one row of a dataset."""
+
+    row = fields.Integer(required=True, allow_none=False, description="The number of the row in the dataset.")
+    prediction = fields.Raw(required=False, allow_none=False,
+                            description="The prediction, described by the model's output schema.")
+    error = fields.String(required=False, allow_none=False, description="The reason the row could not be scored.")
+
+
+class JobResultsPageSchema(Schema):
+    """A schema for a page of the results of a scoring job."""
+
+    job_id = fields.String(required=True, allow_none=False, description="The id of the job.")
+    page = fields.Integer(required=True, allow_none=False, description="The number of the page.")
+    total_pages = fields.Integer(required=True, allow_none=True,
+                                 description="The number of pages of results, null until the job first runs.")
+    next_page = fields.Integer(required=True, allow_none=True, description="The number of the next page, if any.")
+    results = fields.Nested(JobResultSchema, many=True, required=True, allow_none=False,
+                            description="The results of the rows in the page.")
+
+
 class ErrorSchema(Schema):
     """A schema for returning errors through the api."""
 
@@ -0,0 +1,289 @@
+"""Open-loop load test of the lambda that replays API Gateway events at a target arrival rate.
+
+Each line of the traffic file is a JSON object holding an API Gateway event, at least the resource, path, httpMethod,
+pathParameters and body fields. The events are sent at the target rate whether or not earlier requests have finished,
+so a slow response delays nothing but itself. The latency of a request is measured from the time it was scheduled to be
+sent, which corrects for coordinated omission, and the time spent actually being served is reported as the service
+time. The lambda handler in this process serves one request at a time like a Lambda container. Cold starts are
+measured separately by importing the lambda and serving one event in new interpreters.
+
+Usage:
+    python scripts/load_test.py traffic.jsonl --rate 50 --duration 30 [--url http://localhost:8000]
+        [--distribution poisson] [--max-workers 64] [--cold-starts 5] [--output results.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import contextlib
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+# the percentiles reported for each histogram
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+# the script that measures the time it takes to import the lambda and serve the first event in a new interpreter
+COLD_START_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+from model_lambda.lambda_function import lambda_handler
+lambda_handler(event=json.loads(sys.argv[1]), context=None)
+print(int((time.perf_counter() - start) * 1e6))
+"""
+
+
+class LatencyHistogram(object):
+    """Histogram of latencies in microseconds with a bounded relative error, in the style of HdrHistogram.
+
+    Values are counted in buckets that cover powers of two, each split into linear sub-buckets, so every recorded value
+    is kept within a relative error of 10 ** -significant_figures and the memory used grows with the logarithm of the
+    range of values rather than with the number of values.
+
+    """
+
+    def __init__(self, significant_figures=3):
+        """Create an empty histogram."""
+        self.sub_bucket_bits = int(math.ceil(math.log2(2 * 10 ** significant_figures)))
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, value, count=1):
+        """Record a latency in microseconds."""
+        value = max(int(value), 0)
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + count
+            self.count += count
+            self.total += value * count
+            self.maximum = max(self.maximum, value)
+
+    def percentile(self, percentile):
+        """Get the latency at a percentile, None if the histogram is empty."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = max(int(math.ceil(percentile / 100.0 * self.count)), 1)
+            cumulative_count = 0
+            for index in sorted(self._counts):
+                cumulative_count += self._counts[index]
+                if cumulative_count >= target:
+                    return min(self._highest_equivalent_value(index), self.maximum)
+            return self.maximum
+
+    @property
+    def mean(self):
+        """Get the mean latency, None if the histogram is empty."""
+        return self.total / self.count if self.count > 0 else None
+
+    def summary(self):
+        """Get the count, mean, maximum and percentiles of the latencies in microseconds."""
+        summary = {"count": self.count, "mean": self.mean, "max": self.maximum if self.count > 0 else None}
+        summary.update({"p{:g}".format(percentile): self.percentile(percentile) for percentile in PERCENTILES})
+        return summary
+
+    def _index(self, value):
+        # values below the sub-bucket count are counted exactly, larger values are shifted down to the sub-bucket count
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return shift, value >> shift
+
+    @staticmethod
+    def _highest_equivalent_value(index):
+        shift, sub_bucket = index
+        return ((sub_bucket + 1) << shift) - 1
+
+
+class InProcessTarget(object):
+    """Sends events to the lambda handler in this process, one at a time like a Lambda container serves them.
+
+    The load test holds the lock of the target while a request is served, requests that arrive in the meantime wait for
+    it, which shows up in their response time the same as queueing for a container.
+
+    """
+
+    def __init__(self):
+        """Import the lambda, which loads the models before the load test starts."""
+        from model_lambda.lambda_function import lambda_handler
+        self._lambda_handler = lambda_handler
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        """Serve an event and return the status code of the response."""
+        return self._lambda_handler(event=event, context=None)["statusCode"]
+
+
+class HttpTarget(object):
+    """Sends events as HTTP requests to a server that exposes the API, such as the local server mode."""
+
+    def __init__(self, url, timeout=30.0):
+        """Create a target that sends requests to the base url."""
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, event):
+        """Send the request described by an event and return the status code of the response."""
+        body = event.get("body")
+        request = urllib.request.Request(self.url + event["path"], method=event["httpMethod"],
+                                         data=body.encode("utf-8") if body else None,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def load_traffic(path):
+    """Load the events in a JSON Lines traffic file."""
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip() != ""]
+    if len(events) == 0:
+        raise ValueError("The traffic file does not hold any events.")
+    return events
+
+
+def arrival_offsets(rate, duration, distribution, random_generator):
+    """Get the times in seconds from the start of the test at which requests are scheduled to be sent."""
+    offsets = []
+    offset = 0.0
+    while True:
+        if distribution == "poisson":
+            offset += random_generator.expovariate(rate)
+        else:
+            offset += 1.0 / rate
+        if offset > duration:
+            return offsets
+        offsets.append(offset)
+
+
+def run_load_test(events, target, rate, duration, distribution="constant", max_workers=64, seed=None):
+    """Send the events to the target at the arrival rate for the duration, without waiting for responses.
+
+    Returns the response time histogram, measured from the time each request was scheduled to be sent, the service time
+    histogram, measured from the time each request was actually sent, and the counts of the responses by status code.
+
+    """
+    response_times = LatencyHistogram()
+    service_times = LatencyHistogram()
+    status_counts = {}
+    status_lock = threading.Lock()
+
+    def send(event, scheduled_time):
+        # a target that serves one request at a time has a lock, the time spent waiting for it is not service time
+        with getattr(target, "lock", None) or contextlib.nullcontext():
+            sent_time = time.perf_counter()
+            try:
+                status = target(event)
+            except Exception:
+                status = "exception"
+            finished_time = time.perf_counter()
+
+        response_times.record((finished_time - scheduled_time) * 1e6)
+        service_times.record((finished_time - sent_time) * 1e6)
+        with status_lock:
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    offsets = arrival_offsets(rate, duration, distribution, random.Random(seed))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        start_time = time.perf_counter()
+        for i, offset in enumerate(offsets):
+            scheduled_time = start_time + offset
+
+            # never waiting for earlier requests, only for the time the next request is scheduled to be sent
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, events[i % len(events)], scheduled_time)
+        elapsed_time = time.perf_counter() - start_time
+
+    return {
+        "requests": len(offsets),
+        "scheduling_time": elapsed_time,
+        "response_time": response_times,
+        "service_time": service_times,
+        "status_counts": status_counts}
+
+
+def measure_cold_starts(event, samples):
+    """Measure the time it takes to import the lambda and serve one event in new interpreters."""
+    cold_start_times = LatencyHistogram()
+    for _ in range(samples):
+        process = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, json.dumps(event)], cwd=PROJECT_ROOT,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        cold_start_times.record(int(process.stdout.splitlines()[-1]))
+    return cold_start_times
+
+
+def print_results(results, cold_start_times=None):
+    """Print the summaries of the histograms in milliseconds."""
+    def milliseconds(value):
+        return "{:.2f}".format(value / 1000.0) if value is not None else "-"
+
+    print("{:<36} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "latency (ms)", "count", "mean", "p50", "p90", "p99", "p99.9", "max"))
+    histograms = [("response time (corrected, warm)", results["response_time"]),
+                  ("service time (uncorrected, warm)", results["service_time"])]
+    if cold_start_times is not None:
+        histograms.append(("cold start (import and first event)", cold_start_times))
+    for name, histogram in histograms:
+        summary = histogram.summary()
+        print("{:<36} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            name, summary["count"], milliseconds(summary["mean"]),
+            *[milliseconds(summary["p{:g}".format(percentile)]) for percentile in PERCENTILES],
+            milliseconds(summary["max"])))
+
+    print("requests: {}, scheduled over {:.2f} s, status codes: {}".format(
+        results["requests"], results["scheduling_time"],
+        ", ".join("{}: {}".format(status, count)
+                  for status, count in sorted(results["status_counts"].items(), key=lambda item: str(item[0])))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay API Gateway events against the lambda at a target rate.")
+    parser.add_argument("traffic", help="The JSON Lines file that holds the events to replay.")
+    parser.add_argument("--rate", type=float, required=True, help="The target arrival rate in requests per second.")
+    parser.add_argument("--duration", type=float, default=10.0, help="The duration of the test in seconds.")
+    parser.add_argument("--distribution", choices=["constant", "poisson"], default="constant",
+                        help="The distribution of the time between arrivals.")
+    parser.add_argument("--url", default=None,
+                        help="The base url of a server to send requests to, the lambda handler in this process is "
+                             "used if not set.")
+    parser.add_argument("--max-workers", type=int, default=64, help="The number of threads that send requests.")
+    parser.add_argument("--cold-starts", type=int, default=0,
+                        help="The number of cold starts to measure in new interpreters.")
+    parser.add_argument("--seed", type=int, default=None, help="The seed of the arrival time generator.")
+    parser.add_argument("--output", default=None, help="A file to write the results to as JSON.")
+    args = parser.parse_args()
+
+    traffic = load_traffic(args.traffic)
+    load_test_target = HttpTarget(args.url) if args.url is not None else InProcessTarget()
+    load_test_results = run_load_test(traffic, load_test_target, rate=args.rate, duration=args.duration,
+                                      distribution=args.distribution, max_workers=args.max_workers, seed=args.seed)
+    cold_starts = measure_cold_starts(traffic[0], args.cold_starts) if args.cold_starts > 0 else None
+    print_results(load_test_results, cold_starts)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({
+                "requests": load_test_results["requests"],
+                "rate": args.rate,
+                "duration": args.duration,
+                "response_time": load_test_results["response_time"].summary(),
+                "service_time": load_test_results["service_time"].summary(),
+                "cold_start": cold_starts.summary() if cold_starts is not None else None,
+                "status_counts": {str(status): count for status, count in load_test_results["status_counts"].items()}},
+                f, indent=2)
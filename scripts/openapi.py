@@ -10,7 +10,8 @@ if os.path.abspath(os.path.dirname(os.path.dirname(__file__))) not in sys.path:
 
 from model_lambda import __doc__, __version__
 from model_lambda.web_api.schemas import *
-from model_lambda.web_api.controllers import get_models, get_metadata, predict
+from model_lambda.web_api.controllers import get_models, get_metadata, predict, get_feature_statistics, get_metrics, \
+    submit_job, get_job, get_job_results
 
 
 class DocPlugin(BasePlugin):
@@ -34,17 +35,35 @@ spec = APISpec(
 )
 
 # adding schemas to OpenAPI spec from marshmallow schema classes
+# the admin routes are private and take an API Gateway API key
+spec.components.security_scheme("api_key", {"type": "apiKey", "in": "header", "name": "x-api-key"})
+
 spec.components.schema("Model", schema=ModelSchema)
 spec.components.schema("ModelCollection", schema=ModelCollectionSchema)
 spec.components.schema("JsonSchemaProperty", schema=JsonSchemaProperty)
 spec.components.schema("JSONSchema", schema=JSONSchema)
 spec.components.schema("ModelMetadata", schema=ModelMetadataSchema)
+spec.components.schema("QuantileSketch", schema=QuantileSketchSchema)
+spec.components.schema("FeatureSummary", schema=FeatureSummarySchema)
+spec.components.schema("FeatureStatistics", schema=FeatureStatisticsSchema)
+spec.components.schema("AdmissionMetrics", schema=AdmissionMetricsSchema)
+spec.components.schema("AuditMetrics", schema=AuditMetricsSchema)
+spec.components.schema("Metrics", schema=MetricsSchema)
+spec.components.schema("JobRequest", schema=JobRequestSchema)
+spec.components.schema("Job", schema=JobSchema)
+spec.components.schema("JobResult", schema=JobResultSchema)
+spec.components.schema("JobResultsPage", schema=JobResultsPageSchema)
 spec.components.schema("Error", schema=ErrorSchema)
 
 # adding paths to OpenAPI spec from controller docstrings
 spec.path(path="/api/models", func=get_models)
 spec.path(path="/api/models/{qualified_name}/metadata", func=get_metadata)
 spec.path(path="/api/models/{qualified_name}/predict", func=predict)
+spec.path(path="/api/admin/models/{qualified_name}/feature_statistics", func=get_feature_statistics)
+spec.path(path="/api/admin/metrics", func=get_metrics)
+spec.path(path="/api/jobs", func=submit_job)
+spec.path(path="/api/jobs/{job_id}", func=get_job)
+spec.path(path="/api/jobs/{job_id}/results", func=get_job_results)
 
 
 with open('openapi_specification.yaml', 'w') as f:
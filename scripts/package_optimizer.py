@@ -0,0 +1,305 @@
+"""Report the size and import time of the packages the lambda uses and build a pruned deployment package manifest.
+
+The lambda handler is run in a new interpreter against the API Gateway events in the tests/data directory and the
+imported modules are recorded. Top level packages that are never imported are left out of the manifest, as are test
+packages and, with --prune-subpackages, any other subpackage that was never imported. The --smoke-test option checks
+that a package built from the manifest still serves the same events with the same status codes.
+
+Usage:
+    python scripts/package_optimizer.py [--fixtures tests/data] [--manifest package_manifest.json]
+        [--prune-subpackages] [--smoke-test]
+"""
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+import tempfile
+import sysconfig
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+# subpackages that hold tests are never needed by the lambda, unless the code actually imports them
+TEST_PACKAGE_NAMES = ("tests", "test")
+
+# the script that serves the API Gateway events in a new interpreter and prints the status code of each event along
+# with the modules that were imported and the import path that they were found on
+SERVE_SCRIPT = """
+import os, sys, json
+sys.path.insert(0, sys.argv[1])
+from model_lambda.lambda_function import lambda_handler
+statuses = {}
+for name, path in json.loads(sys.argv[2]).items():
+    with open(path) as f:
+        event = json.load(f)
+    try:
+        statuses[name] = lambda_handler(event=event, context=None)["statusCode"]
+    except Exception:
+        statuses[name] = None
+modules = {name: getattr(module, "__file__", None) for name, module in list(sys.modules.items())}
+print(json.dumps({"statuses": statuses, "modules": modules, "sys_path": [os.path.abspath(p) for p in sys.path]}))
+"""
+
+
+def list_fixtures(fixtures_directory):
+    """Get the API Gateway event files in the fixtures directory, keyed by file name."""
+    paths = sorted(glob.glob(os.path.join(fixtures_directory, "api_gateway_*.json")))
+    return {os.path.basename(path): os.path.abspath(path) for path in paths}
+
+
+def serve_fixtures(fixtures, package_directory, isolated=False):
+    """Serve the events with the lambda found in the package directory, in a new interpreter.
+
+    The interpreter runs with -X importtime, an isolated interpreter also runs without the site packages directory and
+    the PYTHONPATH environment variable so that it can only import from the package directory and the standard
+    library. Returns the output of the serve script and the import time of each top level package.
+
+    """
+    options = ["-I", "-S"] if isolated else []
+    process = subprocess.run([sys.executable] + options + ["-X", "importtime", "-c", SERVE_SCRIPT,
+                                                           package_directory, json.dumps(fixtures)],
+                             cwd=package_directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError("Could not serve the events:\n{}".format(process.stderr))
+
+    import_times = {}
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)", line)
+        if match is None:
+            continue
+        top_level_name = match.group(3).split(".")[0]
+        import_times[top_level_name] = import_times.get(top_level_name, 0.0) + int(match.group(1)) / 1e6
+
+    return json.loads(process.stdout.splitlines()[-1]), import_times
+
+
+def find_root(path, sys_path):
+    """Get the import path entry that the file was imported from, None if it is part of the standard library."""
+    path = os.path.abspath(path)
+    standard_library = {os.path.abspath(sysconfig.get_paths()[name]) for name in ("stdlib", "platstdlib")}
+
+    roots = [root for root in sys_path if path.startswith(root + os.sep)]
+    if len(roots) == 0:
+        return None
+
+    # extension modules of the standard library live in a subdirectory of it, such as lib-dynload
+    root = max(roots, key=len)
+    if any(root == directory or root.startswith(directory + os.sep) for directory in standard_library) \
+            and os.path.basename(root) not in ("site-packages", "dist-packages"):
+        return None
+    return root
+
+
+def package_files(root, top_level_name, imported_names, prune_subpackages):
+    """Get the files of a top level package or module that belong in the deployment package, relative to the root."""
+    files = []
+    package_directory = os.path.join(root, top_level_name)
+
+    if os.path.isdir(package_directory):
+        for directory, directory_names, file_names in os.walk(package_directory):
+            module_name = os.path.relpath(directory, root).replace(os.sep, ".")
+
+            # leaving out subpackages that were never imported
+            kept_directory_names = []
+            for directory_name in directory_names:
+                subpackage_name = "{}.{}".format(module_name, directory_name)
+                is_package = os.path.isfile(os.path.join(directory, directory_name, "__init__.py"))
+                was_imported = any(name == subpackage_name or name.startswith(subpackage_name + ".")
+                                   for name in imported_names)
+                if directory_name == "__pycache__":
+                    continue
+                if is_package and not was_imported \
+                        and (prune_subpackages or directory_name in TEST_PACKAGE_NAMES):
+                    continue
+                kept_directory_names.append(directory_name)
+            directory_names[:] = kept_directory_names
+
+            files.extend(os.path.relpath(os.path.join(directory, file_name), root) for file_name in file_names
+                         if not file_name.endswith((".pyc", ".pyo")))
+    else:
+        # a single module, which can be a source file or an extension module
+        files.extend(os.path.relpath(path, root) for path in glob.glob(os.path.join(root, top_level_name + ".*"))
+                     if path.endswith((".py", ".so", ".pyd")))
+
+    # the metadata of the distribution and the shared libraries that its wheel vendors next to the package
+    distribution_directories = [name for name in distribution_contents(root).get(top_level_name, ())
+                                if name.endswith((".dist-info", ".libs"))]
+    for distribution_directory in distribution_directories:
+        for directory, _, file_names in os.walk(os.path.join(root, distribution_directory)):
+            files.extend(os.path.relpath(os.path.join(directory, file_name), root) for file_name in file_names)
+
+    return sorted(set(files))
+
+
+_distribution_contents = {}
+
+
+def distribution_contents(root):
+    """Map each top level entry in a site packages directory to all top level entries installed with it."""
+    if root not in _distribution_contents:
+        contents = {}
+        for record_path in glob.glob(os.path.join(root, "*.dist-info", "RECORD")):
+            with open(record_path) as f:
+                entries = {line.split(",")[0].split("/")[0] for line in f if line.strip() != ""}
+            for entry in entries:
+                contents.setdefault(entry.split(".")[0] if not entry.endswith((".dist-info", ".libs")) else entry,
+                                    set()).update(entries)
+        _distribution_contents[root] = contents
+    return _distribution_contents[root]
+
+
+def directory_size(root, top_level_name):
+    """Get the installed size in bytes of a top level package or module, with its distribution metadata and libs."""
+    paths = glob.glob(os.path.join(root, top_level_name)) + glob.glob(os.path.join(root, top_level_name + ".*"))
+    paths.extend(os.path.join(root, name) for name in distribution_contents(root).get(top_level_name, ())
+                 if name.endswith((".dist-info", ".libs")))
+    size = 0
+    for path in paths:
+        if os.path.isfile(path):
+            size += os.path.getsize(path)
+        for directory, _, file_names in os.walk(path):
+            size += sum(os.path.getsize(os.path.join(directory, file_name)) for file_name in file_names)
+    return size
+
+
+def unused_requirements(imported_top_level_names):
+    """Get the requirements in requirements.txt whose top level packages are never imported by the lambda."""
+    try:
+        from importlib import metadata
+    except ImportError:
+        import importlib_metadata as metadata
+
+    unused = []
+    with open(os.path.join(PROJECT_ROOT, "requirements.txt")) as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            name = line.split("#egg=")[-1] if "#egg=" in line else re.split(r"[=<>~!\[ ]", line)[0]
+            try:
+                distribution = metadata.distribution(name)
+            except metadata.PackageNotFoundError:
+                continue
+
+            top_level_text = distribution.read_text("top_level.txt") or ""
+            top_level_names = {part.split("/")[0] for part in top_level_text.split()}
+            if len(top_level_names) == 0:
+                top_level_names = {str(path).split("/")[0] for path in distribution.files or []
+                                   if ".dist-info" not in str(path)}
+            if len(top_level_names & imported_top_level_names) == 0:
+                unused.append(name)
+    return unused
+
+
+def build_manifest(fixtures_directory, prune_subpackages=False):
+    """Trace the lambda and build the manifest of the files it needs, with a report on each package."""
+    fixtures = list_fixtures(fixtures_directory)
+    trace, import_times = serve_fixtures(fixtures, PROJECT_ROOT)
+
+    # grouping the imported modules by the root they were imported from and the top level package their file is in,
+    # extension modules can register themselves under a name that doesn't match their location
+    packages = {}
+    for name, path in trace["modules"].items():
+        if path is None:
+            continue
+        root = find_root(path, trace["sys_path"])
+        if root is None:
+            continue
+        top_level_name = os.path.relpath(os.path.abspath(path), root).split(os.sep)[0].split(".")[0]
+        packages.setdefault((root, top_level_name), set()).add(name)
+
+    report = []
+    include = []
+    for (root, top_level_name), imported_names in sorted(packages.items(), key=lambda item: item[0][1]):
+        files = package_files(root, top_level_name, imported_names, prune_subpackages)
+        included_size = sum(os.path.getsize(os.path.join(root, path)) for path in files)
+        report.append({
+            "package": top_level_name,
+            "root": root,
+            "modules_imported": len(imported_names),
+            "installed_size": directory_size(root, top_level_name),
+            "included_size": included_size,
+            "import_time": import_times.get(top_level_name, 0.0)})
+        include.extend({"root": root, "path": path} for path in files)
+
+    return {
+        "fixtures": {name: {"path": path, "status": trace["statuses"][name]} for name, path in fixtures.items()},
+        "packages": report,
+        "unused_requirements": unused_requirements({top_level_name for _, top_level_name in packages}),
+        "include": include}
+
+
+def print_report(manifest):
+    """Print the size and import time of each package in the manifest."""
+    print("{:<24} {:>8} {:>14} {:>14} {:>12}".format(
+        "package", "modules", "installed (kB)", "included (kB)", "import (ms)"))
+    for package in sorted(manifest["packages"], key=lambda package: package["included_size"], reverse=True):
+        print("{:<24} {:>8} {:>14.1f} {:>14.1f} {:>12.1f}".format(
+            package["package"], package["modules_imported"], package["installed_size"] / 1024.0,
+            package["included_size"] / 1024.0, package["import_time"] * 1000.0))
+
+    installed_size = sum(package["installed_size"] for package in manifest["packages"])
+    included_size = sum(package["included_size"] for package in manifest["packages"])
+    print("total installed size: {:.1f} MB, total included size: {:.1f} MB".format(installed_size / 1048576.0,
+                                                                                   included_size / 1048576.0))
+    if len(manifest["unused_requirements"]) > 0:
+        print("requirements that are never imported: {}".format(", ".join(manifest["unused_requirements"])))
+
+
+def smoke_test(manifest):
+    """Serve the events with a package built from the manifest, return True if every status code is unchanged.
+
+    The package is built from links to the original files and is run in an interpreter that does not see the site
+    packages directory, so a file missing from the manifest causes the same failure it would cause in the lambda.
+
+    """
+    with tempfile.TemporaryDirectory() as package_directory:
+        for entry in manifest["include"]:
+            target = os.path.join(package_directory, entry["path"])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                os.symlink(os.path.join(entry["root"], entry["path"]), target)
+
+        fixtures = {name: fixture["path"] for name, fixture in manifest["fixtures"].items()}
+        try:
+            trace, _ = serve_fixtures(fixtures, package_directory, isolated=True)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            return False
+
+        statuses = trace["statuses"]
+        passed = True
+        for name, fixture in manifest["fixtures"].items():
+            if statuses.get(name) != fixture["status"]:
+                print("{} returned {} instead of {}".format(name, statuses.get(name), fixture["status"]),
+                      file=sys.stderr)
+                passed = False
+        return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a pruned deployment package manifest for the lambda.")
+    parser.add_argument("--fixtures", default=os.path.join(PROJECT_ROOT, "tests", "data"),
+                        help="The directory that holds the API Gateway events to serve.")
+    parser.add_argument("--manifest", default=os.path.join(PROJECT_ROOT, "package_manifest.json"),
+                        help="The file to write the manifest to.")
+    parser.add_argument("--prune-subpackages", action="store_true",
+                        help="Leave out every subpackage that is not imported, not just test packages.")
+    parser.add_argument("--smoke-test", action="store_true",
+                        help="Check that a package built from the manifest still serves the events.")
+    args = parser.parse_args()
+
+    package_manifest = build_manifest(args.fixtures, prune_subpackages=args.prune_subpackages)
+    with open(args.manifest, "w") as f:
+        json.dump(package_manifest, f, indent=2)
+    print_report(package_manifest)
+
+    if args.smoke_test:
+        if smoke_test(package_manifest):
+            print("smoke test passed")
+        else:
+            print("smoke test failed")
+            sys.exit(1)
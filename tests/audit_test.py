@@ -0,0 +1,153 @@
+import gzip
+import json
+import unittest
+import threading
+
+from model_lambda.audit import AuditLogger
+from model_lambda.storage import InMemoryObjectStore
+
+
+# creating an object store that fails every write to test with
+class FailingObjectStore(InMemoryObjectStore):
+
+    def put(self, key, data):
+        raise IOError("some exception")
+
+
+# creating an object store that blocks writes until it is unblocked to test with
+class BlockingObjectStore(InMemoryObjectStore):
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.unblock = threading.Event()
+
+    def put(self, key, data):
+        self.writing.set()
+        self.unblock.wait(timeout=5.0)
+        super().put(key, data)
+
+
+def read_records(store):
+    records = []
+    for key in store.list_keys(prefix="audit/"):
+        lines = gzip.decompress(store.get(key)).decode("utf-8").splitlines()
+        records.extend(json.loads(line) for line in lines)
+    return records
+
+
+class AuditLoggerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that flush() writes the logged records as compressed JSON Lines objects"""
+        # arrange
+        store = InMemoryObjectStore()
+        audit_logger = AuditLogger(store=store, batch_size=100, flush_interval=60.0)
+
+        # act
+        for i in range(3):
+            audit_logger.log(qualified_name="qualified_name", data={"a": i}, prediction={"b": i})
+        flushed = audit_logger.flush(timeout=5.0)
+        records = read_records(store)
+
+        # assert
+        self.assertTrue(flushed)
+        self.assertTrue(len(store.list_keys(prefix="audit/")) == 1)
+        self.assertTrue([record["input"] for record in records] == [{"a": 0}, {"a": 1}, {"a": 2}])
+        self.assertTrue([record["output"] for record in records] == [{"b": 0}, {"b": 1}, {"b": 2}])
+        self.assertTrue(audit_logger.get_metrics()["written"] == 3)
+        self.assertTrue(audit_logger.get_metrics()["pending"] == 0)
+
+    def test2(self):
+        """testing that records are written in batches of batch_size records"""
+        # arrange
+        store = InMemoryObjectStore()
+        audit_logger = AuditLogger(store=store, batch_size=2, flush_interval=60.0)
+
+        # act
+        for i in range(5):
+            audit_logger.log(qualified_name="qualified_name", data={"a": i}, prediction={"b": i})
+        audit_logger.flush(timeout=5.0)
+
+        # assert
+        self.assertTrue(len(store.list_keys(prefix="audit/")) == 3)
+        self.assertTrue(len(read_records(store)) == 5)
+
+    def test3(self):
+        """testing that records are left out of the audit log by sampling"""
+        # arrange
+        store = InMemoryObjectStore()
+        audit_logger = AuditLogger(store=store, sample_rate=0.0)
+
+        # act
+        for i in range(10):
+            audit_logger.log(qualified_name="qualified_name", data={"a": i}, prediction={"b": i})
+        flushed = audit_logger.flush(timeout=5.0)
+
+        # assert
+        self.assertTrue(flushed)
+        self.assertTrue(store.list_keys() == [])
+        self.assertTrue(audit_logger.get_metrics()["sampled_out"] == 10)
+
+    def test4(self):
+        """testing that records are dropped when the queue is full"""
+        # arrange
+        store = BlockingObjectStore()
+        audit_logger = AuditLogger(store=store, batch_size=1, queue_size=1)
+
+        # the first record is taken off the queue by the writer thread, which then blocks while writing it
+        audit_logger.log(qualified_name="qualified_name", data={}, prediction={})
+        store.writing.wait(timeout=5.0)
+
+        # act
+        audit_logger.log(qualified_name="qualified_name", data={}, prediction={})
+        audit_logger.log(qualified_name="qualified_name", data={}, prediction={})
+        store.unblock.set()
+        audit_logger.flush(timeout=5.0)
+
+        # assert
+        self.assertTrue(audit_logger.get_metrics()["dropped"] == 1)
+        self.assertTrue(audit_logger.get_metrics()["written"] == 2)
+
+    def test5(self):
+        """testing that errors raised by the object store are counted and don't escape the audit logger"""
+        # arrange
+        audit_logger = AuditLogger(store=FailingObjectStore())
+
+        # act
+        exception_raised = False
+        try:
+            audit_logger.log(qualified_name="qualified_name", data={}, prediction={})
+            flushed = audit_logger.flush(timeout=5.0)
+        except Exception:
+            exception_raised = True
+
+        # assert
+        self.assertFalse(exception_raised)
+        self.assertTrue(flushed)
+        self.assertTrue(audit_logger.get_metrics()["write_errors"] == 1)
+
+    def test6(self):
+        """testing that flush_due() is True only while a record has been held for longer than flush_interval"""
+        # arrange
+        store = BlockingObjectStore()
+        audit_logger = AuditLogger(store=store, batch_size=100, flush_interval=0.1)
+
+        # act, the writer thread blocks while writing the record so it is held until the store is unblocked
+        audit_logger.log(qualified_name="qualified_name", data={}, prediction={})
+        due_after_log = audit_logger.flush_due()
+        store.writing.wait(timeout=5.0)
+        due_while_held = audit_logger.flush_due()
+        store.unblock.set()
+        audit_logger.flush(timeout=5.0)
+        due_after_flush = audit_logger.flush_due()
+
+        # assert
+        self.assertFalse(due_after_log)
+        self.assertTrue(due_while_held)
+        self.assertFalse(due_after_flush)
+        self.assertTrue(audit_logger.get_metrics()["written"] == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from model_lambda.batch import deduplicate, dedupe_ratio
+
+
+class BatchTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that deduplicate() finds the distinct rows and the position of every row among them"""
+        # arrange
+        rows = [{"a": 1, "b": 2}, {"a": 2, "b": 2}, {"b": 2, "a": 1}, {"a": 1.0, "b": 2}, {"a": 2, "b": 2}]
+
+        # act
+        unique_rows, positions = deduplicate(rows)
+
+        # assert
+        self.assertTrue(unique_rows == [{"a": 1, "b": 2}, {"a": 2, "b": 2}, {"a": 1.0, "b": 2}])
+        self.assertTrue(positions == [0, 1, 0, 2, 1])
+        self.assertTrue([unique_rows[position] for position in positions] == rows)
+
+    def test2(self):
+        """testing deduplicate() with a key function"""
+        # arrange
+        rows = ['{"a": 1}', '{"a": 1}  ', '{"a": 2}']
+
+        # act
+        unique_rows, positions = deduplicate(rows, key=str.strip)
+
+        # assert
+        self.assertTrue(unique_rows == ['{"a": 1}', '{"a": 2}'])
+        self.assertTrue(positions == [0, 0, 1])
+
+    def test3(self):
+        """testing dedupe_ratio()"""
+        # arrange, act, assert
+        self.assertTrue(dedupe_ratio(4, 1) == 0.75)
+        self.assertTrue(dedupe_ratio(4, 4) == 0.0)
+        self.assertTrue(dedupe_ratio(0, 0) == 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
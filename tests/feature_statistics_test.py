@@ -0,0 +1,140 @@
+import json
+import random
+import unittest
+import statistics
+
+from model_lambda.feature_statistics import QuantileSketch, FeatureSummary, FeatureStatistics
+
+
+class QuantileSketchTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the QuantileSketch approximates quantiles in bounded memory"""
+        # arrange
+        sketch = QuantileSketch(max_centroids=50)
+        values = [random.uniform(0.0, 1000.0) for _ in range(20000)]
+
+        # act
+        for value in values:
+            sketch.add(value)
+        median = sketch.quantile(0.5)
+        state = sketch.to_dict()
+
+        # assert
+        self.assertTrue(abs(median - statistics.median(values)) < 25.0)
+        self.assertTrue(len(state["means"]) <= 100)
+        self.assertTrue(sum(state["weights"]) == 20000)
+
+    def test2(self):
+        """testing that merging two QuantileSketch objects approximates the quantiles of all of the values"""
+        # arrange
+        first_sketch = QuantileSketch()
+        second_sketch = QuantileSketch()
+        for value in range(1000):
+            first_sketch.add(float(value))
+            second_sketch.add(float(value + 1000))
+
+        # act
+        first_sketch.merge(QuantileSketch.from_dict(json.loads(json.dumps(second_sketch.to_dict()))))
+
+        # assert
+        self.assertTrue(abs(first_sketch.quantile(0.5) - 1000.0) < 50.0)
+        self.assertTrue(abs(first_sketch.quantile(0.99) - 1980.0) < 50.0)
+
+    def test3(self):
+        """testing that an empty QuantileSketch has no quantiles"""
+        # arrange
+        sketch = QuantileSketch()
+
+        # act
+        median = sketch.quantile(0.5)
+
+        # assert
+        self.assertTrue(median is None)
+
+    def test4(self):
+        """testing that the QuantileSketch approximates the quantiles in the tails of a skewed distribution"""
+        # arrange
+        sketch = QuantileSketch()
+        random_generator = random.Random(0)
+        values = [random_generator.lognormvariate(0.0, 1.0) for _ in range(50000)]
+
+        # act
+        for value in values:
+            sketch.add(value)
+
+        # assert
+        values.sort()
+        for q in (0.01, 0.99):
+            exact_value = values[int(q * len(values)) - 1]
+            self.assertTrue(abs(sketch.quantile(q) - exact_value) <= exact_value * 0.02)
+        self.assertTrue(len(sketch.to_dict()["means"]) <= 200)
+
+
+class FeatureSummaryTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that FeatureSummary computes the count, mean, variance, min and max of the values"""
+        # arrange
+        summary = FeatureSummary()
+        values = [1.0, 2.0, 4.0, 8.0]
+
+        # act
+        for value in values:
+            summary.add(value)
+        state = summary.to_dict()
+
+        # assert
+        self.assertTrue(state["count"] == 4)
+        self.assertTrue(abs(state["mean"] - statistics.mean(values)) < 1e-9)
+        self.assertTrue(abs(state["variance"] - statistics.variance(values)) < 1e-9)
+        self.assertTrue(state["min"] == 1.0)
+        self.assertTrue(state["max"] == 8.0)
+
+    def test2(self):
+        """testing that merging two FeatureSummary objects gives the same statistics as summarizing all the values"""
+        # arrange
+        first_values = [random.gauss(5.0, 2.0) for _ in range(500)]
+        second_values = [random.gauss(10.0, 1.0) for _ in range(300)]
+        first_summary = FeatureSummary()
+        second_summary = FeatureSummary()
+        for value in first_values:
+            first_summary.add(value)
+        for value in second_values:
+            second_summary.add(value)
+
+        # act
+        first_summary.merge(FeatureSummary.from_dict(second_summary.to_dict()))
+
+        # assert
+        all_values = first_values + second_values
+        self.assertTrue(first_summary.count == 800)
+        self.assertTrue(abs(first_summary.mean - statistics.mean(all_values)) < 1e-9)
+        self.assertTrue(abs(first_summary.variance - statistics.variance(all_values)) < 1e-6)
+        self.assertTrue(first_summary.minimum == min(all_values))
+        self.assertTrue(first_summary.maximum == max(all_values))
+
+
+class FeatureStatisticsTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that FeatureStatistics only summarizes finite numerical values of the known features"""
+        # arrange
+        feature_statistics = FeatureStatistics(feature_names=["a", "b"])
+
+        # act
+        feature_statistics.update({"a": 1.0, "b": "x", "c": 1.0})
+        feature_statistics.update({"a": 3, "b": True})
+        feature_statistics.update({"a": float("nan")})
+        feature_statistics.update("not an input")
+        state = feature_statistics.to_dict()
+
+        # assert
+        self.assertTrue(set(state.keys()) == {"a", "b"})
+        self.assertTrue(state["a"]["count"] == 2)
+        self.assertTrue(state["a"]["mean"] == 2.0)
+        self.assertTrue(state["b"]["count"] == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
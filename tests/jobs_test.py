@@ -0,0 +1,281 @@
+import gzip
+import json
+import time
+import unittest
+from unittest import mock
+
+from model_lambda.model_manager import ModelManager
+from model_lambda.storage import InMemoryObjectStore
+from model_lambda.jobs import JobManager, PENDING, RUNNING, COMPLETED, FAILED
+
+
+IRIS_INPUT = {"sepal_length": 5.0, "sepal_width": 3.2, "petal_length": 1.2, "petal_width": 0.2}
+
+
+def create_job_manager(rows, input_key="datasets/input.jsonl", chunk_size=2):
+    model_manager = ModelManager()
+    model_manager.load_models(configuration=[{
+        "module_name": "iris_model.iris_predict",
+        "class_name": "IrisModel"
+    }])
+    store = InMemoryObjectStore()
+    data = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+    store.put(input_key, gzip.compress(data) if input_key.endswith(".gz") else data)
+    return JobManager(store=store, model_manager=model_manager, default_chunk_size=chunk_size)
+
+
+class JobManagerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that submit() creates a pending job"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 3)
+
+        # act
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # assert
+        self.assertTrue(job["status"] == PENDING)
+        self.assertTrue(job["chunk_size"] == 2)
+        self.assertTrue(job_manager.get_job(job["job_id"]) == job)
+        self.assertTrue(job_manager.list_unfinished_jobs() == [job["job_id"]])
+
+    def test2(self):
+        """testing that submit() raises an exception when the model or the dataset is not found"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT])
+
+        # act, assert
+        with self.assertRaises(ValueError):
+            job_manager.submit(qualified_name="asdf", input_key="datasets/input.jsonl")
+        with self.assertRaises(ValueError):
+            job_manager.submit(qualified_name="iris_model", input_key="datasets/asdf.jsonl")
+
+    def test3(self):
+        """testing that run() scores every chunk of a job and saves the results in order"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 5, input_key="datasets/input.jsonl.gz")
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl.gz")
+
+        # act
+        job = job_manager.run(job["job_id"])
+        results = [job_manager.get_results(job["job_id"], page) for page in range(3)]
+
+        # assert
+        self.assertTrue(job["status"] == COMPLETED)
+        self.assertTrue(job["total_chunks"] == 3)
+        self.assertTrue(job["chunks_completed"] == 3)
+        self.assertTrue(job["rows_scored"] == 5)
+        self.assertTrue(job["errors"] == 0)
+        self.assertTrue([len(page) for page in results] == [2, 2, 1])
+        self.assertTrue([result["row"] for page in results for result in page] == [0, 1, 2, 3, 4])
+        self.assertTrue(results[0][0]["prediction"] == {"species": "setosa"})
+        self.assertTrue(job_manager.get_results(job["job_id"], 3) is None)
+        self.assertTrue(job_manager.list_unfinished_jobs() == [])
+
+    def test4(self):
+        """testing that a job that runs out of time is resumed without scoring chunks again"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 6)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # giving the first run enough time for one chunk
+        remaining_times = iter([100.0, 0.0])
+
+        # act
+        first_run = job_manager.run(job["job_id"], time_remaining=lambda: next(remaining_times), time_margin=10.0)
+        first_results = job_manager.get_results(job["job_id"], 0)
+        unfinished_jobs = job_manager.list_unfinished_jobs()
+        second_run = job_manager.run(job["job_id"])
+
+        # assert
+        self.assertTrue(first_run["status"] == RUNNING)
+        self.assertTrue(first_run["chunks_completed"] == 1)
+        self.assertTrue(unfinished_jobs == [job["job_id"]])
+        self.assertTrue(second_run["status"] == COMPLETED)
+        self.assertTrue(second_run["chunks_completed"] == 3)
+        self.assertTrue(second_run["rows_scored"] == 6)
+        self.assertTrue(job_manager.get_results(job["job_id"], 0) == first_results)
+
+    def test5(self):
+        """testing that a chunk saved before the index was updated is not scored again"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 2)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        saved_results = [{"row": 0, "prediction": "saved"}, {"row": 1, "prediction": "saved"}]
+        lines = "".join(json.dumps(result) + "\n" for result in saved_results)
+        job_manager.store.put("jobs/{}/results/000000.jsonl.gz".format(job["job_id"]),
+                              gzip.compress(lines.encode("utf-8")))
+
+        # act
+        job = job_manager.run(job["job_id"])
+
+        # assert
+        self.assertTrue(job["status"] == COMPLETED)
+        self.assertTrue(job_manager.get_results(job["job_id"], 0) == saved_results)
+
+    def test6(self):
+        """testing that rows that can't be scored are saved with an error"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT, {"sepal_length": "asdf"}])
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # act
+        job = job_manager.run(job["job_id"])
+        results = job_manager.get_results(job["job_id"], 0)
+
+        # assert
+        self.assertTrue(job["status"] == COMPLETED)
+        self.assertTrue(job["rows_scored"] == 2)
+        self.assertTrue(job["errors"] == 1)
+        self.assertTrue("prediction" in results[0])
+        self.assertTrue("error" in results[1])
+
+    def test9(self):
+        """testing that rows repeated within a chunk are scored once"""
+        # arrange
+        other_input = {"sepal_length": 6.5, "sepal_width": 3.0, "petal_length": 5.0, "petal_width": 2.0}
+        job_manager = create_job_manager([IRIS_INPUT, other_input, IRIS_INPUT, IRIS_INPUT, other_input], chunk_size=4)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        model_object = job_manager.model_manager.get_model(qualified_name="iris_model")
+
+        # act
+        with mock.patch.object(model_object, "predict", wraps=model_object.predict) as predict_mock:
+            job = job_manager.run(job["job_id"])
+        results = job_manager.get_results(job["job_id"], 0) + job_manager.get_results(job["job_id"], 1)
+
+        # assert
+        self.assertTrue(predict_mock.call_count == 3)
+        self.assertTrue(job["rows_scored"] == 5)
+        self.assertTrue(job["unique_rows_scored"] == 3)
+        self.assertTrue([result["row"] for result in results] == [0, 1, 2, 3, 4])
+        self.assertTrue(results[0]["prediction"] == results[2]["prediction"] == results[3]["prediction"])
+
+    def test7(self):
+        """testing that a job fails when its input dataset can't be read"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT])
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        job_manager.store.put("datasets/input.jsonl", b"\xff\xfe")
+
+        # act
+        job = job_manager.run(job["job_id"])
+
+        # assert
+        self.assertTrue(job["status"] == FAILED)
+        self.assertTrue(job["error"] == "Could not read the input dataset.")
+        self.assertTrue(job_manager.list_unfinished_jobs() == [])
+
+    def test8(self):
+        """testing that get_job() returns None for a job that does not exist"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT])
+
+        # act
+        job = job_manager.get_job("asdf")
+
+        # assert
+        self.assertTrue(job is None)
+
+    def test10(self):
+        """testing that the input dataset of a job is read once and a run only reads the chunks that it scores"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 6)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # giving the first run enough time for one chunk
+        remaining_times = iter([100.0, 0.0])
+
+        # act
+        with mock.patch.object(job_manager.store, "get", wraps=job_manager.store.get) as get_mock:
+            job_manager.run(job["job_id"], time_remaining=lambda: next(remaining_times), time_margin=10.0)
+            first_run_keys = [call[0][0] for call in get_mock.call_args_list]
+            get_mock.reset_mock()
+            job = job_manager.run(job["job_id"])
+            second_run_keys = [call[0][0] for call in get_mock.call_args_list]
+
+        # assert
+        self.assertTrue(job["status"] == COMPLETED)
+        self.assertTrue(first_run_keys.count("datasets/input.jsonl") == 1)
+        self.assertTrue([key for key in first_run_keys if "/inputs/" in key] == [
+            "jobs/{}/inputs/000000.jsonl.gz".format(job["job_id"])])
+        self.assertTrue("datasets/input.jsonl" not in second_run_keys)
+        self.assertTrue([key for key in second_run_keys if "/inputs/" in key] == [
+            "jobs/{}/inputs/000001.jsonl.gz".format(job["job_id"]),
+            "jobs/{}/inputs/000002.jsonl.gz".format(job["job_id"])])
+
+    def test11(self):
+        """testing that run() leaves a job leased by another run alone until the lease expires"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 2)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        job["lease"] = {"owner": "other", "expires": time.time() + 60.0}
+        job_manager._save_job(job)
+
+        # act
+        leased_run = job_manager.run(job["job_id"])
+        leased_results = job_manager.get_results(job["job_id"], 0)
+        job["lease"]["expires"] = time.time() - 1.0
+        job_manager._save_job(job)
+        expired_run = job_manager.run(job["job_id"])
+
+        # assert
+        self.assertTrue(leased_run["status"] == PENDING)
+        self.assertTrue(leased_run["lease"]["owner"] == "other")
+        self.assertTrue(leased_results is None)
+        self.assertTrue(expired_run["status"] == COMPLETED)
+        self.assertTrue(expired_run["lease"] is None)
+
+    def test12(self):
+        """testing that a chunk that stops every run that scores it is marked FAILED after max_chunk_attempts"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 4)
+        job_manager.lease_duration = 0.0
+        job_manager.max_chunk_attempts = 2
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        model_object = job_manager.model_manager.get_model(qualified_name="iris_model")
+
+        # the runs are stopped while scoring the first chunk, the same as a lambda that times out
+        class RunStopped(BaseException):
+            pass
+
+        # act
+        stopped_runs = 0
+        with mock.patch.object(model_object, "predict", side_effect=RunStopped()):
+            for _ in range(2):
+                try:
+                    job_manager.run(job["job_id"])
+                except RunStopped:
+                    stopped_runs += 1
+        job = job_manager.run(job["job_id"])
+        failed_results = job_manager.get_results(job["job_id"], 0)
+
+        # assert
+        self.assertTrue(stopped_runs == 2)
+        self.assertTrue(job["status"] == COMPLETED)
+        self.assertTrue(job["failed_chunks"] == 1)
+        self.assertTrue(job["errors"] == 2)
+        self.assertTrue(failed_results == [{"row": 0, "error": "The chunk could not be scored in 2 attempts."},
+                                           {"row": 1, "error": "The chunk could not be scored in 2 attempts."}])
+        self.assertTrue(job_manager.get_results(job["job_id"], 1)[0]["prediction"] == {"species": "setosa"})
+
+    def test13(self):
+        """testing that list_unfinished_jobs() only lists the registry of unfinished jobs"""
+        # arrange
+        job_manager = create_job_manager([IRIS_INPUT] * 4)
+        finished_job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+        job_manager.run(finished_job["job_id"])
+        unfinished_job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # act
+        with mock.patch.object(job_manager.store, "list_keys", wraps=job_manager.store.list_keys) as list_keys_mock:
+            job_ids = job_manager.list_unfinished_jobs()
+
+        # assert
+        self.assertTrue(job_ids == [unfinished_job["job_id"]])
+        self.assertTrue(list_keys_mock.call_args_list == [mock.call(prefix="jobs/unfinished/")])
+        self.assertFalse(job_manager.store.exists("jobs/unfinished/" + finished_job["job_id"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
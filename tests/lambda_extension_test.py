@@ -0,0 +1,73 @@
+import json
+import unittest
+import threading
+from unittest import mock
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from model_lambda.lambda_extension import register_internal_extension
+
+
+# creating a handler that stands in for the Lambda Extensions API to test with
+class ExtensionsAPIHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))
+        self.server.requests.append(("POST", self.path, self.headers["Lambda-Extension-Name"], body))
+        self._send({}, {"Lambda-Extension-Identifier": "extension-id"})
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, self.headers["Lambda-Extension-Identifier"], None))
+        self._send({"eventType": "SHUTDOWN"}, {})
+        self.server.shutdown_sent.set()
+
+    def _send(self, body, headers):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LambdaExtensionTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that register_internal_extension() registers for INVOKE events and asks for the next event"""
+        # arrange
+        server = HTTPServer(("127.0.0.1", 0), ExtensionsAPIHandler)
+        server.requests = []
+        server.shutdown_sent = threading.Event()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        # act
+        try:
+            with mock.patch.dict("os.environ", {"AWS_LAMBDA_RUNTIME_API": "127.0.0.1:{}".format(server.server_port)}):
+                registered = register_internal_extension("extension-name")
+            server.shutdown_sent.wait(timeout=5.0)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # assert
+        self.assertTrue(registered)
+        self.assertTrue(server.requests == [
+            ("POST", "/2020-01-01/extension/register", "extension-name", {"events": ["INVOKE"]}),
+            ("GET", "/2020-01-01/extension/event/next", "extension-id", None)])
+
+    def test2(self):
+        """testing that register_internal_extension() does nothing outside of Lambda"""
+        # arrange, act
+        with mock.patch.dict("os.environ", clear=True):
+            registered = register_internal_extension("extension-name")
+
+        # assert
+        self.assertFalse(registered)
+
+
+if __name__ == '__main__':
+    unittest.main()
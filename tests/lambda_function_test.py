@@ -1,6 +1,7 @@
 import os
 import unittest
 import json
+from unittest import mock
 
 from model_lambda.web_api.controllers import Response
 
@@ -32,8 +33,7 @@ class LambdaFunctionTests(unittest.TestCase):
     def test2(self):
         """test model manager is loaded with configuration when the lambda_function module is initiated"""
         # arrange, act
-        from model_lambda.model_manager import ModelManager
-        model_manager = ModelManager()
+        from model_lambda.lambda_function import model_manager
 
         # assert
         self.assertTrue(model_manager.get_models() == [{'display_name': 'Iris Model', 'qualified_name': 'iris_model', 'description': 'A machine learning model for predicting the species of a flower based on its measurements.', 'major_version': 0, 'minor_version': 1}])
@@ -136,5 +136,275 @@ class LambdaFunctionTests(unittest.TestCase):
         self.assertTrue((exception_message == "This lambda cannot handle this resource."))
 
 
+    def test7(self):
+        """test for handling GET /api/admin/metrics endpoint request in lambda_function.lambda_handler"""
+        # arrange
+        from model_lambda.lambda_function import lambda_handler
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_metrics_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+
+        # act
+        exception_thrown = False
+        exception_message = None
+        try:
+            result = lambda_handler(event=event, context=None)
+        except Exception as e:
+            exception_thrown = True
+            exception_message = str(e)
+
+        # assert
+        self.assertFalse(exception_thrown)
+        self.assertTrue(type(result) == dict)
+        self.assertTrue(result["statusCode"] == 200)
+        self.assertTrue(result["headers"] == {'Content-Type': 'application/json'})
+        self.assertTrue(set(json.loads(result["body"])["admission"].keys()) == {"admitted", "rejected_body_size", "rejected_batch_rows", "rejected_concurrency", "in_flight"})
+
+
+    def test8(self):
+        """test for handling GET /api/admin/models/{qualified_name}/feature_statistics endpoint request in lambda_function.lambda_handler"""
+        # arrange
+        from model_lambda.lambda_function import lambda_handler
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_feature_statistics_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+
+        # act
+        exception_thrown = False
+        exception_message = None
+        try:
+            result = lambda_handler(event=event, context=None)
+        except Exception as e:
+            exception_thrown = True
+            exception_message = str(e)
+
+        # assert
+        self.assertFalse(exception_thrown)
+        self.assertTrue(type(result) == dict)
+        self.assertTrue(result["statusCode"] == 200)
+        self.assertTrue(result["headers"] == {'Content-Type': 'application/json'})
+        self.assertTrue(json.loads(result["body"])["qualified_name"] == "iris_model")
+
+
+    def test9(self):
+        """test for profiling a request that sends the profiling token in lambda_function.lambda_handler"""
+        # arrange
+        import model_lambda.lambda_function as lambda_function
+        from model_lambda.profiling import RequestProfiler
+        from model_lambda.storage import InMemoryObjectStore
+
+        store = InMemoryObjectStore()
+        request_profiler = RequestProfiler(store=store, token="secret")
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_predict_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+        event["headers"]["X-Profile"] = "secret"
+
+        # act
+        with mock.patch.object(lambda_function, "request_profiler", request_profiler):
+            result = lambda_function.lambda_handler(event=event, context=None)
+
+        # assert
+        self.assertTrue(result["statusCode"] == 200)
+        self.assertTrue(json.loads(result["body"]) == {"species": "setosa"})
+        profile_id = result["headers"]["X-Profile-Id"]
+        self.assertTrue(store.exists("profiles/{}.prof".format(profile_id)))
+        self.assertTrue(store.exists("profiles/{}.json".format(profile_id)))
+
+    def test10(self):
+        """test for submitting a scoring job, running it with a job event and reading its results"""
+        # arrange
+        import model_lambda.lambda_function as lambda_function
+        from model_lambda.jobs import JobManager
+        from model_lambda.storage import InMemoryObjectStore
+
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n')
+        job_manager = JobManager(store=store, model_manager=lambda_function.model_manager)
+
+        submit_event = {"resource": "/api/jobs", "path": "/api/jobs", "httpMethod": "POST", "headers": {},
+                        "pathParameters": None, "queryStringParameters": None,
+                        "body": '{"qualified_name": "iris_model", "input_key": "datasets/input.jsonl"}'}
+
+        # giving the job run plenty of time
+        context = mock.Mock()
+        context.get_remaining_time_in_millis.return_value = 300000
+
+        # act
+        with mock.patch.object(lambda_function, "job_manager", job_manager):
+            submit_result = lambda_function.lambda_handler(event=submit_event, context=None)
+            job_id = json.loads(submit_result["body"])["job_id"]
+            run_result = lambda_function.lambda_handler(event={"source": "model_lambda.jobs"}, context=context)
+            job_result = lambda_function.lambda_handler(event={
+                "resource": "/api/jobs/{job_id}", "path": "/api/jobs/" + job_id, "httpMethod": "GET",
+                "headers": {}, "pathParameters": {"job_id": job_id}, "queryStringParameters": None,
+                "body": None}, context=None)
+            results_result = lambda_function.lambda_handler(event={
+                "resource": "/api/jobs/{job_id}/results", "path": "/api/jobs/" + job_id + "/results",
+                "httpMethod": "GET", "headers": {}, "pathParameters": {"job_id": job_id},
+                "queryStringParameters": {"page": "0"}, "body": None}, context=None)
+
+        # assert
+        self.assertTrue(submit_result["statusCode"] == 202)
+        self.assertTrue([job["job_id"] for job in run_result["jobs"]] == [job_id])
+        self.assertTrue(job_result["statusCode"] == 200)
+        self.assertTrue(json.loads(job_result["body"])["status"] == "COMPLETED")
+        self.assertTrue(results_result["statusCode"] == 200)
+        self.assertTrue(json.loads(results_result["body"])["results"] == [{"row": 0, "prediction": {"species": "setosa"}}])
+
+    def test11(self):
+        """test for a job event when jobs are not enabled in lambda_function.lambda_handler"""
+        # arrange
+        from model_lambda.lambda_function import lambda_handler
+
+        # act
+        exception_raised = False
+        try:
+            lambda_handler(event={"source": "model_lambda.jobs"}, context=None)
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+
+    def test12(self):
+        """test for handling POST /api/models/{qualified_name}/predict endpoint request in lambda_function.async_lambda_handler"""
+        # arrange
+        import asyncio
+        from model_lambda.lambda_function import async_lambda_handler
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_predict_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+
+        async def handle_concurrently():
+            return await asyncio.gather(*[async_lambda_handler(event=event, context=None) for _ in range(3)])
+
+        # act
+        results = asyncio.run(handle_concurrently())
+
+        # assert
+        self.assertTrue([result["statusCode"] for result in results] == [200, 200, 200])
+        self.assertTrue(all(json.loads(result["body"]) == {"species": "setosa"} for result in results))
+
+    def test13(self):
+        """test for calling lambda_function.lambda_handler from several threads at the same time"""
+        # arrange
+        from concurrent.futures import ThreadPoolExecutor
+        from model_lambda.lambda_function import lambda_handler
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_predict_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+
+        # act
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: lambda_handler(event=event, context=None), range(8)))
+
+        # assert
+        self.assertTrue([result["statusCode"] for result in results] == [200] * 8)
+        self.assertTrue(all(json.loads(result["body"]) == {"species": "setosa"} for result in results))
+
+    def test14(self):
+        """test that invocations of lambda_function.lambda_handler don't wait for the audit log to be written"""
+        # arrange
+        import model_lambda.lambda_function as lambda_function
+        from model_lambda.audit import AuditLogger
+        from model_lambda.storage import InMemoryObjectStore
+
+        store = InMemoryObjectStore()
+        audit_logger = AuditLogger(store=store, batch_size=100, flush_interval=60.0)
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_predict_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+
+        # act
+        with mock.patch.object(lambda_function, "audit_logger", audit_logger):
+            results = [lambda_function.lambda_handler(event=event, context=None) for _ in range(5)]
+            keys_before_shutdown = store.list_keys(prefix="audit/")
+            lambda_function.shutdown()
+            keys_after_shutdown = store.list_keys(prefix="audit/")
+
+        # assert
+        self.assertTrue([result["statusCode"] for result in results] == [200] * 5)
+        self.assertTrue(keys_before_shutdown == [])
+        self.assertTrue(0 < len(keys_after_shutdown) < 5)
+        self.assertTrue(audit_logger.get_metrics()["written"] == 5)
+
+    def test15(self):
+        """test that a job event stops starting jobs when less than a fraction of the function timeout is left"""
+        # arrange
+        import model_lambda.lambda_function as lambda_function
+        from model_lambda.jobs import JobManager
+        from model_lambda.storage import InMemoryObjectStore
+
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n')
+        job_manager = JobManager(store=store, model_manager=lambda_function.model_manager)
+        job = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")
+
+        # the invocation starts with 100 seconds left and has 5 seconds left when the first job would be started
+        context = mock.Mock()
+        context.get_remaining_time_in_millis.side_effect = [100000, 5000]
+
+        # act
+        with mock.patch.object(lambda_function, "job_manager", job_manager):
+            run_result = lambda_function.lambda_handler(event={"source": "model_lambda.jobs"}, context=context)
+
+        # assert
+        self.assertTrue(run_result == {"jobs": []})
+        self.assertTrue(job_manager.get_job(job["job_id"])["status"] == "PENDING")
+
+    def test16(self):
+        """test for a job request when jobs are not enabled in lambda_function.lambda_handler"""
+        # arrange
+        from model_lambda.lambda_function import lambda_handler
+
+        event = {"resource": "/api/jobs/{job_id}", "path": "/api/jobs/asdf", "httpMethod": "GET", "headers": {},
+                 "pathParameters": {"job_id": "asdf"}, "queryStringParameters": None, "body": None}
+
+        # act
+        result = lambda_handler(event=event, context=None)
+
+        # assert
+        self.assertTrue(result["statusCode"] == 501)
+        self.assertTrue(json.loads(result["body"])["type"] == "NOT_IMPLEMENTED")
+
+    def test17(self):
+        """test for profiling a request and rejecting an unknown event in lambda_function.async_lambda_handler"""
+        # arrange
+        import asyncio
+        import model_lambda.lambda_function as lambda_function
+        from model_lambda.profiling import RequestProfiler
+        from model_lambda.storage import InMemoryObjectStore
+
+        store = InMemoryObjectStore()
+        request_profiler = RequestProfiler(store=store, token="secret")
+
+        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", "api_gateway_predict_event.json")
+        with open(path) as json_file:
+            event = json.load(json_file)
+        event["headers"]["X-Profile"] = "secret"
+
+        # act
+        with mock.patch.object(lambda_function, "request_profiler", request_profiler):
+            result = asyncio.run(lambda_function.async_lambda_handler(event=event, context=None))
+        exception_raised = False
+        try:
+            asyncio.run(lambda_function.async_lambda_handler(event={"source": "unknown"}, context=None))
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(result["statusCode"] == 200)
+        self.assertTrue(json.loads(result["body"]) == {"species": "setosa"})
+        self.assertTrue(store.exists("profiles/{}.prof".format(result["headers"]["X-Profile-Id"])))
+        self.assertTrue(exception_raised)
+
+
 if __name__ == '__main__':
     unittest.main()
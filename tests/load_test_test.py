@@ -0,0 +1,102 @@
+import time
+import random
+import unittest
+import threading
+
+from scripts.load_test import LatencyHistogram, InProcessTarget, arrival_offsets, run_load_test
+
+
+class LatencyHistogramTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the LatencyHistogram percentiles are within the relative error of the exact percentiles"""
+        # arrange
+        histogram = LatencyHistogram(significant_figures=3)
+        values = sorted(random.randint(1, 10000000) for _ in range(10000))
+
+        # act
+        for value in values:
+            histogram.record(value)
+
+        # assert
+        self.assertTrue(histogram.count == 10000)
+        self.assertTrue(histogram.maximum == values[-1])
+        for percentile in (50.0, 99.0, 99.9):
+            exact_value = values[int(percentile / 100.0 * len(values)) - 1]
+            self.assertTrue(abs(histogram.percentile(percentile) - exact_value) <= exact_value * 0.001 + 1)
+
+    def test2(self):
+        """testing that an empty LatencyHistogram has no percentiles"""
+        # arrange
+        histogram = LatencyHistogram()
+
+        # act
+        summary = histogram.summary()
+
+        # assert
+        self.assertTrue(summary["count"] == 0)
+        self.assertTrue(summary["p99"] is None)
+
+
+class LoadTestTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that arrival_offsets() schedules requests at the target rate"""
+        # arrange, act
+        constant_offsets = arrival_offsets(rate=100.0, duration=2.0, distribution="constant",
+                                           random_generator=random.Random(0))
+        poisson_offsets = arrival_offsets(rate=100.0, duration=100.0, distribution="poisson",
+                                          random_generator=random.Random(0))
+
+        # assert
+        self.assertTrue(len(constant_offsets) in (199, 200))
+        self.assertTrue(abs(len(poisson_offsets) - 10000) < 500)
+
+    def test2(self):
+        """testing that run_load_test() keeps sending requests at the target rate when the target is slow"""
+        # arrange
+        def slow_target(event):
+            time.sleep(0.05)
+            return 200
+
+        # act
+        results = run_load_test(events=[{}], target=slow_target, rate=100.0, duration=0.5, max_workers=1)
+
+        # assert
+        self.assertTrue(results["requests"] in (49, 50))
+        self.assertTrue(results["status_counts"] == {200: results["requests"]})
+        self.assertTrue(results["scheduling_time"] < 1.0)
+        # the requests queue up behind the single worker, which shows up in the response time but not the service time
+        self.assertTrue(results["response_time"].percentile(99.0) > 1000000)
+        self.assertTrue(results["service_time"].percentile(99.0) < 200000)
+
+    def test3(self):
+        """testing that run_load_test() sends one request at a time to the in process target"""
+        # arrange
+        target = InProcessTarget()
+        counter_lock = threading.Lock()
+        calls = {"active": 0, "max_active": 0}
+
+        def lambda_handler(event, context):
+            with counter_lock:
+                calls["active"] += 1
+                calls["max_active"] = max(calls["max_active"], calls["active"])
+            time.sleep(0.02)
+            with counter_lock:
+                calls["active"] -= 1
+            return {"statusCode": 200}
+
+        target._lambda_handler = lambda_handler
+
+        # act
+        results = run_load_test(events=[{}], target=target, rate=100.0, duration=0.5, max_workers=8)
+
+        # assert
+        self.assertTrue(results["status_counts"] == {200: results["requests"]})
+        self.assertTrue(calls["max_active"] == 1)
+        # the requests wait for the target, the time spent waiting is in the response time but not the service time
+        self.assertTrue(results["response_time"].percentile(99.0) > 2 * results["service_time"].percentile(99.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import threading
 from traceback import print_tb
 from ml_model_abc import MLModel
 from model_lambda.model_manager import ModelManager
@@ -55,8 +56,7 @@ class ModelManagerTests(unittest.TestCase):
         self.assertTrue(model_object is not None)
 
     def test2(self):
-        """testing that the ModelManager will return the same instance of an MLModel class from several different
-        instances of ModelManager"""
+        """testing that separate instances of ModelManager hold separate sets of models"""
         # arrange
         # instantiating the model manager class
         first_model_manager = ModelManager()
@@ -70,15 +70,17 @@ class ModelManagerTests(unittest.TestCase):
         ])
 
         # act
-        first_model_object = first_model_manager.get_model(qualified_name="iris_model")
+        first_model_object = first_model_manager.get_model(qualified_name="qualified_name")
 
         # instantiating the ModelManager class again
         second_model_manager = ModelManager()
 
-        second_model_object = second_model_manager.get_model(qualified_name="iris_model")
+        second_model_object = second_model_manager.get_model(qualified_name="qualified_name")
 
         # assert
-        self.assertTrue(str(first_model_object) == str(second_model_object))
+        self.assertTrue(first_model_object is not None)
+        self.assertTrue(second_model_object is None)
+        self.assertTrue(second_model_manager.get_models() == [])
 
     def test3(self):
         """ testing that the ModelManager only allows MLModel objects to be stored """
@@ -104,5 +106,109 @@ class ModelManagerTests(unittest.TestCase):
         self.assertTrue(exception_message == "The ModelManager can only hold references to objects of type MLModel.")
 
 
+    def test4(self):
+        """testing that the ModelManager keeps the models it holds when loading new models fails"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.model_manager_test",
+            "class_name": "MLModelMock"
+        }])
+
+        # act
+        exception_raised = False
+        try:
+            model_manager.load_models(configuration=[
+                {
+                    "module_name": "tests.model_manager_test",
+                    "class_name": "MLModelMock"
+                },
+                {
+                    "module_name": "tests.model_manager_test",
+                    "class_name": "SomeClass"
+                }
+            ])
+        except Exception as e:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(len(model_manager.get_models()) == 1)
+        self.assertTrue(model_manager.get_model(qualified_name="qualified_name") is not None)
+
+    def test5(self):
+        """testing that lookups made while the models are being reloaded in another thread always find a model"""
+        # arrange
+        model_manager = ModelManager()
+        configuration = [{
+            "module_name": "tests.model_manager_test",
+            "class_name": "MLModelMock"
+        }]
+        model_manager.load_models(configuration=configuration)
+
+        missing_lookups = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                if model_manager.get_model(qualified_name="qualified_name") is None:
+                    missing_lookups.append(1)
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+
+        # act
+        for thread in readers:
+            thread.start()
+        for _ in range(200):
+            model_manager.load_models(configuration=configuration)
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        # assert
+        self.assertTrue(len(missing_lookups) == 0)
+
+
+    def test6(self):
+        """testing that the ModelManager keeps statistics of the input features of a model"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+
+        # act
+        model_manager.update_feature_statistics(qualified_name="iris_model", data={"sepal_length": 1.0, "sepal_width": 2.0, "petal_length": 3.0, "petal_width": 4.0})
+        model_manager.update_feature_statistics(qualified_name="iris_model", data=[{"sepal_length": 3.0, "sepal_width": 2.0, "petal_length": 3.0, "petal_width": 4.0}])
+        model_manager.update_feature_statistics(qualified_name="asdf", data={"sepal_length": 1.0})
+        feature_statistics = model_manager.get_feature_statistics(qualified_name="iris_model")
+
+        # assert
+        self.assertTrue(feature_statistics["qualified_name"] == "iris_model")
+        self.assertTrue(set(feature_statistics["features"].keys()) == {"sepal_length", "sepal_width", "petal_length", "petal_width"})
+        self.assertTrue(feature_statistics["features"]["sepal_length"]["count"] == 2)
+        self.assertTrue(feature_statistics["features"]["sepal_length"]["mean"] == 2.0)
+        self.assertTrue(model_manager.get_feature_statistics(qualified_name="asdf") is None)
+
+    def test7(self):
+        """testing that the ModelManager keeps the statistics of a model when it is reloaded"""
+        # arrange
+        configuration = [{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }]
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=configuration)
+        model_manager.update_feature_statistics(qualified_name="iris_model", data={"sepal_length": 1.0, "sepal_width": 2.0, "petal_length": 3.0, "petal_width": 4.0})
+
+        # act
+        model_manager.load_models(configuration=configuration)
+        feature_statistics = model_manager.get_feature_statistics(qualified_name="iris_model")
+
+        # assert
+        self.assertTrue(feature_statistics["features"]["sepal_length"]["count"] == 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,28 @@
+import os
+import unittest
+
+from scripts.package_optimizer import build_manifest, smoke_test
+
+
+class PackageOptimizerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that a package built from the pruned manifest still serves the API Gateway events"""
+        # arrange
+        fixtures_directory = os.path.join(os.path.abspath(os.path.dirname(__file__)), "data")
+        manifest = build_manifest(fixtures_directory, prune_subpackages=True)
+
+        # act
+        passed = smoke_test(manifest)
+
+        # assert
+        self.assertTrue(passed)
+        self.assertTrue(manifest["fixtures"]["api_gateway_predict_event.json"]["status"] == 200)
+        self.assertTrue(any(entry["path"] == os.path.join("model_lambda", "lambda_function.py")
+                            for entry in manifest["include"]))
+        self.assertFalse(any(entry["path"].startswith("tests" + os.sep) for entry in manifest["include"]))
+        self.assertTrue("apispec" in manifest["unused_requirements"])
+
+
+if __name__ == '__main__':
+    unittest.main()
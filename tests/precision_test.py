@@ -0,0 +1,221 @@
+import os
+import json
+import tempfile
+import unittest
+
+import numpy
+from sklearn import datasets
+from sklearn.pipeline import make_pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from ml_model_abc import MLModel
+
+from model_lambda.model_manager import ModelManager
+from model_lambda.precision import Float32Estimator, reduce_precision, load_sample
+
+
+# creating an MLModel class that holds a scikit-learn estimator to test with
+class LogisticRegressionModel(MLModel):
+    display_name = "display name"
+    qualified_name = "logistic_regression"
+    description = "description"
+    major_version = 1
+    minor_version = 1
+    input_schema = None
+    output_schema = None
+
+    def __init__(self):
+        iris = datasets.load_iris()
+        self._model = LogisticRegression(max_iter=1000).fit(iris.data, iris.target)
+
+    def predict(self, data):
+        X = numpy.array([data["features"]])
+        probabilities = self._model.predict_proba(X)[0]
+        return {"probabilities": [float(probability) for probability in probabilities]}
+
+
+# creating an MLModel class whose predictions change when its estimator is converted to test with
+class SensitiveModel(LogisticRegressionModel):
+
+    def predict(self, data):
+        X = numpy.array([data["features"]])
+        return {"exact": self._model.predict_proba(X).dtype == numpy.float64}
+
+
+# creating an MLModel class that holds a pipeline of a column transformer and a classifier to test with
+class PipelineModel(LogisticRegressionModel):
+
+    def __init__(self):
+        iris = datasets.load_iris()
+        self._model = make_pipeline(ColumnTransformer([("scaler", StandardScaler(), [0, 1, 2, 3])]),
+                                    LogisticRegression(max_iter=1000)).fit(iris.data, iris.target)
+
+
+# creating an estimator that holds no arrays to test with
+class ConstantEstimator(object):
+
+    def get_params(self, deep=True):
+        return {}
+
+    def predict(self, X):
+        return numpy.zeros(len(X))
+
+
+# creating an MLModel class whose estimator holds no float64 arrays to test with
+class ConstantModel(LogisticRegressionModel):
+
+    def __init__(self):
+        self._model = ConstantEstimator()
+
+    def predict(self, data):
+        return {"prediction": float(self._model.predict(numpy.array([data["features"]]))[0])}
+
+
+SAMPLE = [{"features": [5.1, 3.5, 1.4, 0.2]}, {"features": [6.3, 2.5, 5.0, 1.9]}, {"features": [5.9, 3.0, 4.2, 1.5]}]
+
+
+class PrecisionTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that reduce_precision() converts the estimators of a model that keeps its predictions"""
+        # arrange
+        model_object = LogisticRegressionModel()
+        expected_predictions = [model_object.predict(data) for data in SAMPLE]
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=SAMPLE, tolerance=1e-4)
+
+        # assert
+        self.assertTrue(bytes_saved > 0)
+        self.assertTrue(type(model_object._model) is Float32Estimator)
+        self.assertTrue(model_object._model.coef_.dtype == numpy.float32)
+        self.assertTrue(model_object._model.predict_proba(numpy.array([[5.1, 3.5, 1.4, 0.2]])).dtype == numpy.float32)
+        for data, expected in zip(SAMPLE, expected_predictions):
+            self.assertTrue(numpy.allclose(model_object.predict(data)["probabilities"], expected["probabilities"],
+                                           atol=1e-4))
+
+    def test2(self):
+        """testing that reduce_precision() puts back the estimators of a model whose predictions change"""
+        # arrange
+        model_object = SensitiveModel()
+        estimator = model_object._model
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=SAMPLE)
+
+        # assert
+        self.assertTrue(bytes_saved == 0)
+        self.assertTrue(model_object._model is estimator)
+        self.assertTrue(model_object._model.coef_.dtype == numpy.float64)
+
+    def test3(self):
+        """testing that reduce_precision() puts back the estimators of a model that fails after the conversion"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        model_object = model_manager.get_model(qualified_name="iris_model")
+        estimators = dict(vars(model_object))
+        sample = [{"sepal_length": 5.0, "sepal_width": 3.2, "petal_length": 1.2, "petal_width": 0.2}]
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=sample)
+
+        # assert, libsvm only predicts with float64 arrays
+        self.assertTrue(bytes_saved == 0)
+        self.assertTrue(vars(model_object) == estimators)
+        self.assertTrue(model_object.predict(sample[0]) == {"species": "setosa"})
+
+    def test4(self):
+        """testing that reduce_precision() does not convert a model when there is no sample"""
+        # arrange
+        model_object = LogisticRegressionModel()
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=[])
+
+        # assert
+        self.assertTrue(bytes_saved == 0)
+        self.assertTrue(model_object._model.coef_.dtype == numpy.float64)
+
+    def test5(self):
+        """testing that load_models() converts a model configured with float32 precision"""
+        # arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sample.jsonl")
+            with open(path, "w") as f:
+                f.write("".join(json.dumps(data) + "\n" for data in SAMPLE))
+            model_manager = ModelManager()
+
+            # act
+            model_manager.load_models(configuration=[{
+                "module_name": "tests.precision_test",
+                "class_name": "LogisticRegressionModel",
+                "precision": "float32",
+                "parity_sample": path,
+                "parity_tolerance": 1e-3
+            }])
+            sample = load_sample(path)
+
+        # assert
+        model_object = model_manager.get_model(qualified_name="logistic_regression")
+        self.assertTrue(type(model_object._model) is Float32Estimator)
+        self.assertTrue(sample == SAMPLE)
+
+    def test6(self):
+        """testing that load_models() raises an exception for an unknown precision"""
+        # arrange
+        model_manager = ModelManager()
+
+        # act
+        exception_raised = False
+        try:
+            model_manager.load_models(configuration=[{
+                "module_name": "tests.precision_test",
+                "class_name": "LogisticRegressionModel",
+                "precision": "float16"
+            }])
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(model_manager.get_models() == [])
+
+    def test7(self):
+        """testing that reduce_precision() converts the estimators held in the steps of a pipeline"""
+        # arrange
+        model_object = PipelineModel()
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=SAMPLE)
+
+        # assert
+        pipeline = model_object._model.estimator
+        self.assertTrue(type(model_object._model) is Float32Estimator)
+        self.assertTrue(pipeline.steps[0][1].transformers_[0][1].mean_.dtype == numpy.float32)
+        self.assertTrue(pipeline.steps[1][1].coef_.dtype == numpy.float32)
+        self.assertTrue(bytes_saved == sum(array.nbytes for array in (
+            pipeline.steps[0][1].transformers_[0][1].mean_, pipeline.steps[0][1].transformers_[0][1].var_,
+            pipeline.steps[0][1].transformers_[0][1].scale_, pipeline.steps[1][1].coef_,
+            pipeline.steps[1][1].intercept_)))
+
+    def test8(self):
+        """testing that reduce_precision() puts back the estimators of a model that holds no float64 arrays"""
+        # arrange
+        model_object = ConstantModel()
+        estimator = model_object._model
+
+        # act
+        bytes_saved = reduce_precision(model_object, sample=SAMPLE)
+
+        # assert
+        self.assertTrue(bytes_saved == 0)
+        self.assertTrue(model_object._model is estimator)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import pstats
+import tempfile
+import unittest
+
+from model_lambda.profiling import RequestProfiler
+from model_lambda.storage import InMemoryObjectStore
+
+
+def slow_function(duration):
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        pass
+    return "result"
+
+
+class RequestProfilerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that should_profile() only selects requests that send the right token in the trigger header"""
+        # arrange
+        request_profiler = RequestProfiler(store=InMemoryObjectStore(), token="secret")
+        no_token_profiler = RequestProfiler(store=InMemoryObjectStore())
+
+        # act
+        right_token = request_profiler.should_profile({"headers": {"x-profile": "secret"}})
+        wrong_token = request_profiler.should_profile({"headers": {"X-Profile": "guess"}})
+        no_header = request_profiler.should_profile({"headers": None})
+        token_not_set = no_token_profiler.should_profile({"headers": {"X-Profile": "secret"}})
+
+        # assert
+        self.assertTrue(right_token)
+        self.assertFalse(wrong_token)
+        self.assertFalse(no_header)
+        self.assertFalse(token_not_set)
+
+    def test2(self):
+        """testing that should_profile() selects requests by sampling"""
+        # arrange
+        always_profiler = RequestProfiler(store=InMemoryObjectStore(), sample_rate=1.0)
+        never_profiler = RequestProfiler(store=InMemoryObjectStore(), sample_rate=0.0)
+
+        # act, assert
+        self.assertTrue(always_profiler.should_profile({}))
+        self.assertFalse(never_profiler.should_profile({}))
+
+    def test3(self):
+        """testing that profile() saves a cProfile file and a summary with the deterministic profiler"""
+        # arrange
+        store = InMemoryObjectStore()
+        request_profiler = RequestProfiler(store=store, mode="deterministic")
+
+        # act
+        result, profile_id = request_profiler.profile(slow_function, 0.01)
+        summary = json.loads(store.get("profiles/{}.json".format(profile_id)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.prof")
+            with open(path, "wb") as f:
+                f.write(store.get("profiles/{}.prof".format(profile_id)))
+            stats = pstats.Stats(path)
+
+        # assert
+        self.assertTrue(result == "result")
+        self.assertTrue(summary["profile_id"] == profile_id)
+        self.assertTrue(any("slow_function" in function["function"] for function in summary["top_functions"]))
+        self.assertTrue(any(function_name == "slow_function" for (_, _, function_name) in stats.stats))
+
+    def test4(self):
+        """testing that profile() saves folded call stacks and a summary with the sampling profiler"""
+        # arrange
+        store = InMemoryObjectStore()
+        request_profiler = RequestProfiler(store=store, mode="sampling", sampling_interval=0.001)
+
+        # act
+        result, profile_id = request_profiler.profile(slow_function, 0.1)
+        summary = json.loads(store.get("profiles/{}.json".format(profile_id)))
+        folded_stacks = store.get("profiles/{}.folded".format(profile_id)).decode("utf-8")
+
+        # assert
+        self.assertTrue(result == "result")
+        self.assertTrue(summary["samples"] > 0)
+        self.assertTrue("slow_function" in folded_stacks)
+        self.assertTrue(any("slow_function" in function["function"] for function in summary["top_functions"]))
+
+    def test5(self):
+        """testing that an unknown profiling mode is rejected"""
+        # arrange, act
+        exception_raised = False
+        try:
+            RequestProfiler(store=InMemoryObjectStore(), mode="asdf")
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import signal
+import tempfile
+import unittest
+import subprocess
+import urllib.error
+import urllib.request
+
+import numpy
+
+from model_lambda.model_manager import ModelManager
+from model_lambda.server import PreForkServer, event_from_request, share_model_arrays
+
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+IRIS_INPUT = {"sepal_length": 5.0, "sepal_width": 3.2, "petal_length": 1.2, "petal_width": 0.2}
+
+
+class ServerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that event_from_request() converts a request into an API Gateway event"""
+        # arrange, act
+        event = event_from_request("POST", "/api/models/iris_model/predict", "", {"Content-Type": "application/json"},
+                                   '{"a": 1}')
+
+        # assert
+        self.assertTrue(event["resource"] == "/api/models/{qualified_name}/predict")
+        self.assertTrue(event["path"] == "/api/models/iris_model/predict")
+        self.assertTrue(event["httpMethod"] == "POST")
+        self.assertTrue(event["headers"] == {"Content-Type": "application/json"})
+        self.assertTrue(event["pathParameters"] == {"qualified_name": "iris_model"})
+        self.assertTrue(event["queryStringParameters"] is None)
+        self.assertTrue(event["body"] == '{"a": 1}')
+
+    def test2(self):
+        """testing event_from_request() with query string parameters, escaped path parameters and trailing slashes"""
+        # arrange, act
+        results_event = event_from_request("GET", "/api/jobs/abc%20def/results", "page=1&page=2&x=", {}, None)
+        models_event = event_from_request("GET", "/api/models/", "", {}, None)
+
+        # assert
+        self.assertTrue(results_event["resource"] == "/api/jobs/{job_id}/results")
+        self.assertTrue(results_event["pathParameters"] == {"job_id": "abc def"})
+        self.assertTrue(results_event["queryStringParameters"] == {"page": "2", "x": ""})
+        self.assertTrue(results_event["multiValueQueryStringParameters"] == {"page": ["1", "2"], "x": [""]})
+        self.assertTrue(models_event["resource"] == "/api/models")
+        self.assertTrue(models_event["pathParameters"] is None)
+
+    def test3(self):
+        """testing that event_from_request() returns None for paths that don't match a resource"""
+        # arrange, act, assert
+        self.assertTrue(event_from_request("GET", "/", "", {}, None) is None)
+        self.assertTrue(event_from_request("GET", "/api/models/iris_model", "", {}, None) is None)
+        self.assertTrue(event_from_request("GET", "/api/models//metadata", "", {}, None) is None)
+
+    def test4(self):
+        """testing that share_model_arrays() moves the arrays of the models into read only memory"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        model_object = model_manager.get_model(qualified_name="iris_model")
+        expected_prediction = model_object.predict(IRIS_INPUT)
+
+        # act
+        bytes_shared = share_model_arrays(model_manager, min_bytes=1)
+        arrays = [value for estimator in vars(model_object).values() if hasattr(estimator, "get_params")
+                  for value in vars(estimator).values() if isinstance(value, numpy.ndarray) and value.nbytes > 0]
+
+        # assert
+        self.assertTrue(bytes_shared > 0)
+        self.assertTrue(len(arrays) > 0)
+        self.assertTrue(all(not array.flags.writeable for array in arrays))
+        self.assertTrue(model_object.predict(IRIS_INPUT) == expected_prediction)
+
+    def test5(self):
+        """testing that the server serves requests from its workers, replaces them and stops on SIGTERM"""
+        # arrange
+        process = subprocess.Popen([sys.executable, "-m", "model_lambda.server", "--host", "127.0.0.1", "--port", "0",
+                                    "--workers", "2", "--share-arrays"],
+                                   cwd=PROJECT_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        try:
+            port = int(process.stdout.readline().split()[-1])
+            url = "http://127.0.0.1:{}".format(port)
+
+            def get(path, data=None):
+                request = urllib.request.Request(url + path, data=data, method="POST" if data else "GET",
+                                                 headers={"Content-Type": "application/json"})
+                try:
+                    with urllib.request.urlopen(request, timeout=10.0) as response:
+                        return response.status, json.loads(response.read())
+                except urllib.error.HTTPError as e:
+                    return e.code, json.loads(e.read())
+
+            def list_workers():
+                return set(int(pid) for pid in subprocess.check_output(
+                    ["pgrep", "-P", str(process.pid)], universal_newlines=True).split())
+
+            def wait_for_workers(replaced_pids):
+                # waiting until the parent has replaced the workers, new workers are listed as soon as they are forked
+                for _ in range(100):
+                    worker_pids = list_workers()
+                    if len(worker_pids) == 2 and worker_pids.isdisjoint(replaced_pids):
+                        break
+                    time.sleep(0.1)
+                return worker_pids
+
+            def wait_for_server():
+                for _ in range(100):
+                    try:
+                        return get("/api/models")
+                    except urllib.error.URLError:
+                        time.sleep(0.1)
+                raise AssertionError("The server did not respond.")
+
+            # act
+            models_status, models = wait_for_server()
+            predict_status, prediction = get("/api/models/iris_model/predict", json.dumps(IRIS_INPUT).encode("utf-8"))
+            not_found_status, _ = get("/asdf")
+            worker_pids = list_workers()
+            killed_pid = min(worker_pids)
+            os.kill(killed_pid, signal.SIGKILL)
+            restarted_worker_pids = wait_for_workers({killed_pid})
+            restarted_status, _ = wait_for_server()
+            process.send_signal(signal.SIGHUP)
+            rolled_worker_pids = wait_for_workers(restarted_worker_pids)
+            rolled_status, _ = wait_for_server()
+            process.send_signal(signal.SIGTERM)
+            exit_code = process.wait(timeout=30.0)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+        # assert
+        self.assertTrue(models_status == 200)
+        self.assertTrue(models["models"][0]["qualified_name"] == "iris_model")
+        self.assertTrue(predict_status == 200)
+        self.assertTrue(prediction == {"species": "setosa"})
+        self.assertTrue(not_found_status == 404)
+        self.assertTrue(len(worker_pids) == 2)
+        self.assertTrue(len(restarted_worker_pids) == 2 and killed_pid not in restarted_worker_pids)
+        self.assertTrue(restarted_status == 200)
+        self.assertTrue(len(rolled_worker_pids) == 2 and rolled_worker_pids.isdisjoint(restarted_worker_pids))
+        self.assertTrue(rolled_status == 200)
+        self.assertTrue(exit_code == 0)
+
+    def test6(self):
+        """testing that the server calls the background task repeatedly in a worker process and stops it on SIGTERM"""
+        # arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "runs.txt")
+
+            def background():
+                with open(path, "a") as f:
+                    f.write("{}\n".format(os.getpid()))
+
+            server = PreForkServer(lambda_handler=None, host="127.0.0.1", port=0, workers=1, heartbeat_interval=0.1,
+                                   background=background, background_interval=0.1)
+            server.bind()
+
+            # act
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    server.serve_forever()
+                finally:
+                    os._exit(0)
+            server.socket.close()
+            try:
+                for _ in range(100):
+                    if os.path.exists(path) and len(open(path).read().split()) >= 3:
+                        break
+                    time.sleep(0.1)
+            finally:
+                os.kill(pid, signal.SIGTERM)
+                _, status = os.waitpid(pid, 0)
+            with open(path) as f:
+                background_pids = set(int(line) for line in f.read().split())
+
+        # assert
+        self.assertTrue(len(background_pids) == 1)
+        self.assertTrue(pid not in background_pids)
+        self.assertTrue(status == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
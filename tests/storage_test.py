@@ -0,0 +1,108 @@
+import unittest
+import tempfile
+
+from model_lambda.storage import LocalObjectStore, InMemoryObjectStore, create_object_store
+
+
+class LocalObjectStoreTests(unittest.TestCase):
+
+    def test1(self):
+        """testing put(), get(), exists(), delete() and list_keys() of the LocalObjectStore"""
+        # arrange
+        with tempfile.TemporaryDirectory() as directory:
+            store = LocalObjectStore(directory)
+
+            # act
+            store.put("a/b/c.txt", b"abc")
+            store.put("a/d.txt", b"d")
+            store.put("e.txt", b"e")
+            store.put("f.txt", b"f")
+            store.delete("f.txt")
+            store.delete("g.txt")
+
+            # assert
+            self.assertTrue(store.get("a/b/c.txt") == b"abc")
+            self.assertTrue(store.exists("a/d.txt"))
+            self.assertFalse(store.exists("a/f.txt"))
+            self.assertTrue(store.list_keys(prefix="a/") == ["a/b/c.txt", "a/d.txt"])
+            self.assertTrue(store.list_keys() == ["a/b/c.txt", "a/d.txt", "e.txt"])
+
+    def test2(self):
+        """testing that the LocalObjectStore raises KeyError for missing keys and rejects keys outside of its directory"""
+        # arrange
+        with tempfile.TemporaryDirectory() as directory:
+            store = LocalObjectStore(directory)
+
+            # act
+            key_error_raised = False
+            try:
+                store.get("missing.txt")
+            except KeyError:
+                key_error_raised = True
+
+            value_error_raised = False
+            try:
+                store.put("../outside.txt", b"")
+            except ValueError:
+                value_error_raised = True
+
+            # assert
+            self.assertTrue(key_error_raised)
+            self.assertTrue(value_error_raised)
+
+
+class InMemoryObjectStoreTests(unittest.TestCase):
+
+    def test1(self):
+        """testing put(), get(), exists(), delete() and list_keys() of the InMemoryObjectStore"""
+        # arrange
+        store = InMemoryObjectStore()
+
+        # act
+        store.put("a/b.txt", b"b")
+        store.put("c.txt", b"c")
+        store.put("e.txt", b"e")
+        store.delete("e.txt")
+        store.delete("f.txt")
+
+        # assert
+        self.assertTrue(store.get("a/b.txt") == b"b")
+        self.assertTrue(store.exists("c.txt"))
+        self.assertFalse(store.exists("d.txt"))
+        self.assertTrue(store.list_keys(prefix="a/") == ["a/b.txt"])
+        self.assertTrue(store.list_keys() == ["a/b.txt", "c.txt"])
+
+
+class CreateObjectStoreTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that create_object_store() creates the object store named in the configuration"""
+        # arrange
+        with tempfile.TemporaryDirectory() as directory:
+
+            # act
+            local_store = create_object_store({"module_name": "model_lambda.storage", "class_name": "LocalObjectStore",
+                                               "parameters": {"directory": directory}})
+            in_memory_store = create_object_store({"module_name": "model_lambda.storage",
+                                                   "class_name": "InMemoryObjectStore"})
+
+            # assert
+            self.assertTrue(type(local_store) is LocalObjectStore)
+            self.assertTrue(local_store.directory == directory)
+            self.assertTrue(type(in_memory_store) is InMemoryObjectStore)
+
+    def test2(self):
+        """testing that create_object_store() raises an exception for a class that is not an ObjectStore"""
+        # arrange, act
+        exception_raised = False
+        try:
+            create_object_store({"module_name": "collections", "class_name": "OrderedDict"})
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+
+
+if __name__ == '__main__':
+    unittest.main()
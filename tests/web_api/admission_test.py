@@ -0,0 +1,78 @@
+import unittest
+
+from model_lambda.web_api.admission import AdmissionController
+
+
+class AdmissionControllerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that check_body_size() rejects bodies over the limit"""
+        # arrange
+        admission_controller = AdmissionController(max_body_size=10)
+
+        # act
+        small_body_admitted = admission_controller.check_body_size("{}")
+        large_body_admitted = admission_controller.check_body_size("[" + "1," * 10 + "1]")
+        multibyte_body_admitted = admission_controller.check_body_size("é" * 6)
+
+        # assert
+        self.assertTrue(small_body_admitted)
+        self.assertFalse(large_body_admitted)
+        self.assertFalse(multibyte_body_admitted)
+        self.assertTrue(admission_controller.get_metrics()["rejected_body_size"] == 2)
+
+    def test2(self):
+        """testing that check_batch_rows() rejects batches over the limit"""
+        # arrange
+        admission_controller = AdmissionController(max_batch_rows=2)
+
+        # act
+        single_input_admitted = admission_controller.check_batch_rows({})
+        small_batch_admitted = admission_controller.check_batch_rows([{}, {}])
+        large_batch_admitted = admission_controller.check_batch_rows([{}, {}, {}])
+
+        # assert
+        self.assertTrue(single_input_admitted)
+        self.assertTrue(small_batch_admitted)
+        self.assertFalse(large_batch_admitted)
+        self.assertTrue(admission_controller.get_metrics()["rejected_batch_rows"] == 1)
+
+    def test3(self):
+        """testing that acquire() sheds requests when all slots are taken and release() frees them"""
+        # arrange
+        admission_controller = AdmissionController(max_concurrent_predictions=1)
+
+        # act
+        first_acquired = admission_controller.acquire()
+        admission_controller.admit()
+        second_acquired = admission_controller.acquire()
+        admission_controller.release()
+        third_acquired = admission_controller.acquire()
+        admission_controller.admit()
+
+        # assert
+        self.assertTrue(first_acquired)
+        self.assertFalse(second_acquired)
+        self.assertTrue(third_acquired)
+        self.assertTrue(admission_controller.get_metrics() == {"admitted": 2, "rejected_body_size": 0,
+                                                               "rejected_batch_rows": 0, "rejected_concurrency": 1,
+                                                               "in_flight": 1})
+
+    def test4(self):
+        """testing that limits set to None are not enforced"""
+        # arrange
+        admission_controller = AdmissionController()
+
+        # act
+        body_admitted = admission_controller.check_body_size("x" * 100000)
+        batch_admitted = admission_controller.check_batch_rows([{}] * 100000)
+        acquired = [admission_controller.acquire() for _ in range(100)]
+
+        # assert
+        self.assertTrue(body_admitted)
+        self.assertTrue(batch_admitted)
+        self.assertTrue(all(acquired))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import time
+import json
+import asyncio
+import unittest
+
+from ml_model_abc import MLModel
+from model_lambda.model_manager import ModelManager
+from model_lambda.jobs import JobManager
+from model_lambda.storage import InMemoryObjectStore
+from model_lambda.web_api.admission import AdmissionController
+import model_lambda.web_api.controllers as controllers
+import model_lambda.web_api.async_controllers as async_controllers
+
+
+# creating an MLModel class that takes a while to make a prediction to test with
+class SlowMLModelMock(MLModel):
+    # accessing the package metadata
+    display_name = "display name"
+    qualified_name = "slow_model"
+    description = "description"
+    major_version = 1
+    minor_version = 1
+    input_schema = None
+    output_schema = None
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        time.sleep(0.2)
+        return {"result": data["value"]}
+
+
+class AsyncControllersTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the async controllers return the same responses as the controllers"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        admission_controller = AdmissionController()
+        request_body = '{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}'
+
+        async def call_controllers():
+            return await asyncio.gather(
+                async_controllers.get_models(model_manager=model_manager),
+                async_controllers.get_metadata(model_manager=model_manager, qualified_name="iris_model"),
+                async_controllers.predict(model_manager=model_manager, qualified_name="iris_model",
+                                          request_body=request_body),
+                async_controllers.get_metrics(admission_controller=admission_controller))
+
+        # act
+        models_result, metadata_result, predict_result, metrics_result = asyncio.run(call_controllers())
+
+        # assert
+        self.assertTrue(type(predict_result) == controllers.Response)
+        self.assertTrue(models_result == controllers.get_models(model_manager=model_manager))
+        self.assertTrue(metadata_result == controllers.get_metadata(model_manager=model_manager,
+                                                                    qualified_name="iris_model"))
+        self.assertTrue(predict_result.status == 200)
+        self.assertTrue(json.loads(predict_result.data) == {"species": "setosa"})
+        self.assertTrue(metrics_result.status == 200)
+
+    def test2(self):
+        """testing that predictions made by the async predict() controller run concurrently"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.web_api.async_controllers_test",
+            "class_name": "SlowMLModelMock"
+        }])
+
+        async def predict_concurrently():
+            return await asyncio.gather(*[
+                async_controllers.predict(model_manager=model_manager, qualified_name="slow_model",
+                                          request_body=json.dumps({"value": i})) for i in range(4)])
+
+        # act
+        start_time = time.perf_counter()
+        results = asyncio.run(predict_concurrently())
+        elapsed_time = time.perf_counter() - start_time
+
+        # assert
+        self.assertTrue([json.loads(result.data) for result in results] == [{"result": i} for i in range(4)])
+        self.assertTrue(elapsed_time < 0.6)
+
+    def test3(self):
+        """testing the async job controllers"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n')
+        job_manager = JobManager(store=store, model_manager=model_manager)
+
+        async def submit_and_run_job():
+            submit_result = await async_controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": "iris_model", "input_key": "datasets/input.jsonl"}')
+            job_id = json.loads(submit_result.data)["job_id"]
+            job_manager.run(job_id)
+            job_result = await async_controllers.get_job(job_manager=job_manager, job_id=job_id)
+            results_result = await async_controllers.get_job_results(job_manager=job_manager, job_id=job_id, page=0)
+            return submit_result, job_result, results_result
+
+        # act
+        submit_result, job_result, results_result = asyncio.run(submit_and_run_job())
+
+        # assert
+        self.assertTrue(submit_result.status == 202)
+        self.assertTrue(json.loads(job_result.data)["status"] == "COMPLETED")
+        self.assertTrue(json.loads(results_result.data)["results"] == [{"row": 0, "prediction": {"species": "setosa"}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
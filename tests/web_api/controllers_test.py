@@ -1,10 +1,16 @@
 import unittest
 import json
+from unittest import mock
 from traceback import print_tb
 
 from ml_model_abc import MLModel
 from model_lambda.model_manager import ModelManager
-from model_lambda.web_api.schemas import ModelCollectionSchema, ModelMetadataSchema, ErrorSchema
+from model_lambda.audit import AuditLogger
+from model_lambda.storage import InMemoryObjectStore
+from model_lambda.jobs import JobManager
+from model_lambda.web_api.admission import AdmissionController
+from model_lambda.web_api.schemas import ModelCollectionSchema, ModelMetadataSchema, FeatureStatisticsSchema, MetricsSchema, \
+    JobSchema, JobResultsPageSchema, ErrorSchema
 import model_lambda.web_api.controllers as controllers
 
 
@@ -38,7 +44,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.get_models()
+        result = controllers.get_models(model_manager=model_manager)
         schema = ModelCollectionSchema()
         data = schema.loads(json_data=result.data)
 
@@ -57,7 +63,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.get_metadata(qualified_name="iris_model")
+        result = controllers.get_metadata(model_manager=model_manager, qualified_name="iris_model")
         schema = ModelMetadataSchema()
         data = schema.loads(json_data=result.data)
 
@@ -77,7 +83,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.get_metadata(qualified_name="asdf")
+        result = controllers.get_metadata(model_manager=model_manager, qualified_name="asdf")
         schema = ErrorSchema()
         data = schema.loads(json_data=result.data)
 
@@ -97,7 +103,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.predict(qualified_name="iris_model", request_body="")
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body="")
         schema = ErrorSchema()
         data = schema.loads(json_data=result.data)
 
@@ -117,7 +123,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.predict(qualified_name="asdf", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
+        result = controllers.predict(model_manager=model_manager, qualified_name="asdf", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
         schema = ErrorSchema()
         data = schema.loads(json_data=result.data)
 
@@ -137,7 +143,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.predict(qualified_name="iris_model", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
         data = json.loads(result.data)
 
         # assert
@@ -156,7 +162,7 @@ class ControllersTests(unittest.TestCase):
         }])
 
         # act
-        result = controllers.predict(qualified_name="iris_model", request_body='{"petal_length": "asdf", "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='{"petal_length": "asdf", "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
         schema = ErrorSchema()
         data = schema.loads(json_data=result.data)
 
@@ -178,7 +184,7 @@ class ControllersTests(unittest.TestCase):
         # act
         exception_raised = False
         try:
-            result = controllers.predict(qualified_name="qualified_name", request_body='{}')
+            result = controllers.predict(model_manager=model_manager, qualified_name="qualified_name", request_body='{}')
             schema = ErrorSchema()
             data = schema.loads(json_data=result.data)
         except Exception as e:
@@ -192,5 +198,295 @@ class ControllersTests(unittest.TestCase):
         self.assertTrue(json.loads(result.data) == {"message": "Could not make a prediction.", "type": "ERROR"})
 
 
+    def test9(self):
+        """testing predict() controller with a batch of inputs"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+
+        # act
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='[{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}, {"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}]')
+
+        # assert
+        self.assertTrue(type(result) == controllers.Response)
+        self.assertTrue(result.status == 200)
+        self.assertTrue(result.mimetype == "application/json")
+        self.assertTrue(json.loads(result.data) == [{"species": "setosa"}, {"species": "setosa"}])
+
+    def test10(self):
+        """testing predict() controller rejects requests that are over the admission limits"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        admission_controller = AdmissionController(max_body_size=200, max_batch_rows=1)
+
+        # act
+        body_result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body="[" + "{}," * 100 + "{}]", admission_controller=admission_controller)
+        batch_result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body="[{}, {}]", admission_controller=admission_controller)
+
+        # assert
+        self.assertTrue(body_result.status == 413)
+        self.assertTrue(json.loads(body_result.data) == {"type": "REQUEST_TOO_LARGE", "message": "The body of the request is too large."})
+        self.assertTrue(batch_result.status == 413)
+        self.assertTrue(json.loads(batch_result.data) == {"type": "REQUEST_TOO_LARGE", "message": "The request holds too many inputs."})
+        self.assertTrue(admission_controller.get_metrics()["in_flight"] == 0)
+        self.assertTrue(admission_controller.get_metrics()["admitted"] == 0)
+        self.assertTrue(admission_controller.get_metrics()["rejected_batch_rows"] == 1)
+
+    def test11(self):
+        """testing predict() controller sheds requests when too many predictions are in progress"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        admission_controller = AdmissionController(max_concurrent_predictions=1, retry_after=5)
+        admission_controller.acquire()
+
+        # act
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}', admission_controller=admission_controller)
+
+        # assert
+        self.assertTrue(result.status == 429)
+        self.assertTrue(result.headers == {"Retry-After": "5"})
+        self.assertTrue(json.loads(result.data) == {"type": "TOO_MANY_REQUESTS", "message": "Too many predictions are in progress."})
+
+    def test12(self):
+        """testing get_metrics() controller"""
+        # arrange
+        admission_controller = AdmissionController()
+        admission_controller.acquire()
+        admission_controller.admit()
+        admission_controller.release()
+
+        # act
+        result = controllers.get_metrics(admission_controller=admission_controller)
+        schema = MetricsSchema()
+        data = schema.loads(json_data=result.data)
+
+        # assert
+        self.assertTrue(type(result) == controllers.Response)
+        self.assertTrue(result.status == 200)
+        self.assertTrue(result.mimetype == "application/json")
+        self.assertTrue(data["admission"]["admitted"] == 1)
+
+
+    def test13(self):
+        """testing predict() controller adds each prediction in a batch to the audit log"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        audit_logger = AuditLogger(store=InMemoryObjectStore())
+
+        # act
+        result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='[{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}, {"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}]', audit_logger=audit_logger)
+        audit_logger.flush(timeout=5.0)
+
+        # assert
+        self.assertTrue(result.status == 200)
+        self.assertTrue(audit_logger.get_metrics()["written"] == 2)
+
+
+    def test14(self):
+        """testing get_feature_statistics() controller after a prediction"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
+
+        # act
+        result = controllers.get_feature_statistics(model_manager=model_manager, qualified_name="iris_model")
+        schema = FeatureStatisticsSchema()
+        data = schema.loads(json_data=result.data)
+
+        # assert
+        self.assertTrue(type(result) == controllers.Response)
+        self.assertTrue(result.status == 200)
+        self.assertTrue(result.mimetype == "application/json")
+        self.assertTrue(data["features"]["petal_length"]["count"] == 1)
+
+    def test15(self):
+        """testing get_feature_statistics() controller with non-existing model"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+
+        # act
+        result = controllers.get_feature_statistics(model_manager=model_manager, qualified_name="asdf")
+
+        # assert
+        self.assertTrue(result.status == 404)
+        self.assertTrue(json.loads(result.data) == {"type": "ERROR", "message": "Model not found."})
+
+    def test16(self):
+        """testing submit_job() controller"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n')
+        job_manager = JobManager(store=store, model_manager=model_manager)
+
+        # act
+        result = controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": "iris_model", "input_key": "datasets/input.jsonl", "chunk_size": 10}')
+        schema = JobSchema()
+        data = schema.loads(json_data=result.data)
+
+        # assert
+        self.assertTrue(type(result) == controllers.Response)
+        self.assertTrue(result.status == 202)
+        self.assertTrue(result.mimetype == "application/json")
+        self.assertTrue(data["status"] == "PENDING")
+        self.assertTrue(data["chunk_size"] == 10)
+
+    def test17(self):
+        """testing submit_job() controller with bad requests"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        job_manager = JobManager(store=InMemoryObjectStore(), model_manager=model_manager)
+
+        # act
+        bad_json_result = controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": ')
+        bad_schema_result = controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": "iris_model", "chunk_size": 0}')
+        not_found_result = controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": "iris_model", "input_key": "datasets/asdf.jsonl"}')
+        no_body_result = controllers.submit_job(job_manager=job_manager, request_body=None)
+        large_chunk_result = controllers.submit_job(job_manager=job_manager, request_body='{"qualified_name": "iris_model", "input_key": "datasets/input.jsonl", "chunk_size": 1000000000}')
+
+        # assert
+        self.assertTrue(no_body_result.status == 400)
+        self.assertTrue(large_chunk_result.status == 400)
+        self.assertTrue(json.loads(large_chunk_result.data)["type"] == "SCHEMA_ERROR")
+        self.assertTrue(json.loads(no_body_result.data) == {"type": "DESERIALIZATION_ERROR", "message": "The request has no body."})
+        self.assertTrue(bad_json_result.status == 400)
+        self.assertTrue(json.loads(bad_json_result.data)["type"] == "DESERIALIZATION_ERROR")
+        self.assertTrue(bad_schema_result.status == 400)
+        self.assertTrue(json.loads(bad_schema_result.data)["type"] == "SCHEMA_ERROR")
+        self.assertTrue(not_found_result.status == 404)
+        self.assertTrue(json.loads(not_found_result.data) == {"type": "ERROR", "message": "Input dataset not found."})
+
+    def test18(self):
+        """testing get_job() and get_job_results() controllers after a job is run"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n' * 3)
+        job_manager = JobManager(store=store, model_manager=model_manager, default_chunk_size=2)
+        job_id = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")["job_id"]
+        job_manager.run(job_id)
+
+        # act
+        job_result = controllers.get_job(job_manager=job_manager, job_id=job_id)
+        first_page_result = controllers.get_job_results(job_manager=job_manager, job_id=job_id, page="0")
+        last_page_result = controllers.get_job_results(job_manager=job_manager, job_id=job_id, page=1)
+        first_page = JobResultsPageSchema().loads(json_data=first_page_result.data)
+        last_page = JobResultsPageSchema().loads(json_data=last_page_result.data)
+
+        # assert
+        self.assertTrue(job_result.status == 200)
+        self.assertTrue(json.loads(job_result.data)["status"] == "COMPLETED")
+        self.assertTrue(first_page_result.status == 200)
+        self.assertTrue(first_page["total_pages"] == 2)
+        self.assertTrue(first_page["next_page"] == 1)
+        self.assertTrue(len(first_page["results"]) == 2)
+        self.assertTrue(last_page["next_page"] is None)
+        self.assertTrue(last_page["results"] == [{"row": 2, "prediction": {"species": "setosa"}}])
+
+    def test19(self):
+        """testing get_job() and get_job_results() controllers with a non-existing job or page"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        store = InMemoryObjectStore()
+        store.put("datasets/input.jsonl", b'{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}\n')
+        job_manager = JobManager(store=store, model_manager=model_manager)
+        job_id = job_manager.submit(qualified_name="iris_model", input_key="datasets/input.jsonl")["job_id"]
+
+        # act
+        job_result = controllers.get_job(job_manager=job_manager, job_id="asdf")
+        job_results_result = controllers.get_job_results(job_manager=job_manager, job_id="asdf", page=0)
+        page_result = controllers.get_job_results(job_manager=job_manager, job_id=job_id, page=0)
+        bad_page_result = controllers.get_job_results(job_manager=job_manager, job_id=job_id, page="asdf")
+
+        # assert
+        self.assertTrue(job_result.status == 404)
+        self.assertTrue(json.loads(job_result.data) == {"type": "ERROR", "message": "Job not found."})
+        self.assertTrue(job_results_result.status == 404)
+        self.assertTrue(page_result.status == 404)
+        self.assertTrue(json.loads(page_result.data) == {"type": "ERROR", "message": "Results page not found."})
+        self.assertTrue(bad_page_result.status == 400)
+
+    def test20(self):
+        """testing predict() controller with a batch that holds duplicate inputs"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "iris_model.iris_predict",
+            "class_name": "IrisModel"
+        }])
+        model_object = model_manager.get_model(qualified_name="iris_model")
+        request_body = json.dumps([
+            {"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0},
+            {"petal_length": 5.0, "petal_width": 2.0, "sepal_length": 6.5, "sepal_width": 3.0},
+            {"sepal_width": 1.0, "sepal_length": 1.0, "petal_width": 1.0, "petal_length": 1.0},
+            {"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}])
+
+        # act
+        with mock.patch.object(model_object, "predict", wraps=model_object.predict) as predict_mock:
+            result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body=request_body)
+        single_result = controllers.predict(model_manager=model_manager, qualified_name="iris_model", request_body='{"petal_length": 1.0, "petal_width": 1.0, "sepal_length": 1.0, "sepal_width": 1.0}')
+        predictions = json.loads(result.data)
+
+        # assert
+        self.assertTrue(result.status == 200)
+        self.assertTrue(predict_mock.call_count == 2)
+        self.assertTrue(len(predictions) == 4)
+        self.assertTrue(predictions[0] == predictions[2] == predictions[3] == {"species": "setosa"})
+        self.assertTrue(result.headers == {"X-Dedupe-Ratio": "0.5000"})
+        self.assertTrue(single_result.headers is None)
+        self.assertTrue(model_manager.get_feature_statistics(qualified_name="iris_model")["features"]["petal_length"]["count"] == 5)
+
+    def test21(self):
+        """testing the job controllers when scoring jobs are not enabled"""
+        # arrange, act
+        submit_result = controllers.submit_job(job_manager=None, request_body='{"qualified_name": "iris_model", "input_key": "datasets/input.jsonl"}')
+        job_result = controllers.get_job(job_manager=None, job_id="asdf")
+        results_result = controllers.get_job_results(job_manager=None, job_id="asdf", page="0")
+
+        # assert
+        for result in (submit_result, job_result, results_result):
+            self.assertTrue(result.status == 501)
+            self.assertTrue(json.loads(result.data) == {"type": "NOT_IMPLEMENTED", "message": "Scoring jobs are not enabled."})
+
+
 if __name__ == '__main__':
     unittest.main()